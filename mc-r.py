@@ -1,80 +1,370 @@
 # License: AGPLv3  (GNU Affero GPL, for maximum protection of software freedom)
 # MopeClassic-Remake/Revival/Reloaded/Return (MC-R)
 
-import pygame
-import random
-import math
-import json
+import time
+STARTED = time.perf_counter()   # for the time-to-first-frame report
 import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')   # keeps stdout clean for --benchmark JSON
+import argparse
+import bisect
+import gc
+import hashlib
+import io
+import json
+import math
+import random
+import struct
 import sys
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict, deque
 import numpy as np
+import pygame
+
+
+
+SAVE_PATH = 'mcr_savegame.npz'
+LEGACY_SAVE_PATH = 'mcr_savegame.json'   # still loaded when no binary save exists
+SAVE_VERSION = 2   # 2 added food uids and base_id, which ties a journal to its base
 
 
 
 class Game:
-    def __init__(self):
-        pygame.init()
+    MIN_GAP = 10   # Minimum gap between obstacles
+    
+    def __init__(self, headless=False, world_size=None, load=None, minimum_bots=35,
+                 tick_rate=60, render_fps=60, max_catchup_steps=5, 
+                 obstacle_count=50, food_count=200, generate=True, recorder=None,
+                 autosave_interval=60, journal_saves=False, lod=False, ai_workers=0):
+        """headless=True runs the world without any display; drive it with step().
+        
+        world_size defaults to 6x the screen (a 1920x1080 screen when headless);
+        obstacle_count and food_count size a newly generated world, and generate=False
+        leaves it empty for tools that build it step by step. With a display, generation
+        is left to run(), which does it a slice per frame behind a progress bar.
+        load=None asks whether to load an existing save (never asked when headless).
+        tick_rate is the fixed simulation rate in Hz (above 0), independent of
+        render_fps (0 = uncapped); a slow frame runs at most max_catchup_steps ticks.
+        recorder is an optional FlightRecorder fed with every frame's timings.
+        run() autosaves every autosave_interval seconds in the background (0 = only on exit);
+        with journal_saves those saves, and the one on exit, only append what changed.
+        lod=True updates bots far from the player less often (see SimulationLOD).
+        ai_workers > 0 decides and moves bots in that many processes (see BotPlannerPool),
+        started by the first step() that needs them; close() stops them again.
+        """
+        if tick_rate <= 0:
+            raise ValueError(f"tick_rate must be above 0, got {tick_rate}")
+        self.headless = headless
+        self.tick_rate = tick_rate
+        self.render_fps = render_fps
+        self.max_catchup_steps = max_catchup_steps
         
         # Constants
-        self.MINIMUM_BOTS = 35   # with 20, the performance is excellent; at 40, collisions don't work 100% anymore
-        
-        # Try to load saved game first
-        self.should_load = False
-        if os.path.exists('mcr_savegame.json'):
-            temp_screen = pygame.display.set_mode((400, 200))
-            font = pygame.font.Font(None, 36)
-            asking = True
-            while asking:
-                temp_screen.fill((20, 20, 20))
-                text = font.render("Load saved game? (Y/N)", True, (255, 255, 255))
-                temp_screen.blit(text, (100, 80))
-                pygame.display.flip()
-                
-                for event in pygame.event.get():
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_y:
-                            self.should_load = True
-                            asking = False
-                        elif event.key == pygame.K_n:
-                            asking = False
-                    elif event.type == pygame.QUIT:
-                        pygame.quit()
-                        sys.exit()
-
-        self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-        self.width = self.screen.get_width()
-        self.height = self.screen.get_height()
+        self.MINIMUM_BOTS = minimum_bots   # collisions use a spatial hash, so the cost grows linearly with the bot count
+        
+        if headless:
+            self.screen = None
+            self.width, self.height = 1920, 1080
+            self.should_load = bool(load)
+        else:
+            # Only what the game uses; pygame.init() would also start audio and joysticks
+            pygame.display.init()
+            pygame.font.init()
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+            self.width = self.screen.get_width()
+            self.height = self.screen.get_height()
+            # Try to load saved game first
+            if load is None:
+                load = find_savegame() is not None and self.ask_to_load()
+            self.should_load = load
+        
         self.clock = pygame.time.Clock()
         self.running = True
-        self.map_size = (self.width * 6, self.height * 6)
+        map_size = tuple(world_size) if world_size else (self.width * 6, self.height * 6)
         self.camera_offset = [0, 0]
+        self.clear_world(map_size)
+        self.creature_pool = []   # eaten bots, recycled by generate_creatures
+        
+        self.start_time = pygame.time.get_ticks()
+        self.food_eaten_count = 0
+        self.show_render_stats = False
+        self.render_stats = {}
+        self.profiler = FrameProfiler()   # F2; costs next to nothing while off
+        self.recorder = recorder
+        self.profiler.set_recording(recorder is not None)
+        self.input_recording = None   # an InputRecording to append every tick's input to
+        self.compress_saves = True
+        self.autosave_interval = autosave_interval
+        self.journal = SaveJournal() if journal_saves else None
+        self.pending_generation = None
+        self.startup_times = {}
+        self.lod = SimulationLOD() if lod else None
+        self.ai_workers = ai_workers
+        self.ai_pool = None   # see planner_pool()
+
+        loaded = self.should_load and self.load_game()
+        if self.should_load and not loaded:
+            # A missing or broken save must not leave an empty (or half restored) map
+            print("No save could be loaded, starting a new world", file=sys.stderr)
+            self.clear_world(map_size)
+        if not loaded and generate:
+            generation = self.world_generation(obstacle_count, food_count)
+            if headless:
+                for _ in generation:
+                    pass
+            else:
+                self.pending_generation = generation
+        
+        if not headless and self.pending_generation is None:
+            self.setup_rendering()
+
+
+
+    def note_first_frame(self):
+        self.startup_times.setdefault('first_frame_ms', (time.perf_counter() - STARTED) * 1000)
+
+
+
+    def report_startup(self):
+        self.note_first_frame()
+        self.startup_times['playing_ms'] = (time.perf_counter() - STARTED) * 1000
+        print(f"startup: first frame after {self.startup_times['first_frame_ms']:.0f} ms, "
+              f"playing after {self.startup_times['playing_ms']:.0f} ms", file=sys.stderr)
+
+
+
+    def finish_generation(self, budget):
+        """Run the pending world generation for about budget seconds and draw its progress.
+        
+        Returns True once the world is complete and ready to play.
+        """
+        deadline = time.perf_counter() + budget
+        done = 0.0
+        for done in self.pending_generation:
+            if time.perf_counter() >= deadline:
+                break
+        else:
+            self.pending_generation = None
+            self.setup_rendering()
+            self.start_time = pygame.time.get_ticks()
+            return True
+        
+        self.screen.fill((20, 20, 20))
+        text = text_cache.render(f"Generating world... {done:.0%}", (255, 255, 255), 36)
+        self.screen.blit(text, text.get_rect(center=(self.width // 2, self.height // 2 - 30)))
+        bar = pygame.Rect(0, 0, 400, 12)
+        bar.center = (self.width // 2, self.height // 2 + 10)
+        pygame.draw.rect(self.screen, (50, 50, 50), bar)
+        pygame.draw.rect(self.screen, (0, 200, 0), (bar.x, bar.y, int(bar.width * done), bar.height))
+        return False
+
+
+
+    def setup_rendering(self):
+        """Build the render caches for the current world (needs self.screen)"""
+        self.static_layer = StaticWorldLayer(self.obstacles, self.map_size, 
+                                             (self.width, self.height))
+        self.radar = Radar(self.obstacles, self.map_size)
+
+
+
+    def place_player(self):
+        # Update player position after obstacles are generated
+        safe_x, safe_y = self.find_safe_spawn_position(40)
+        self.player.x = self.player.prev_x = safe_x
+        self.player.y = self.player.prev_y = safe_y
+
+
+
+    def ask_to_load(self):
+        # Asked on the game's own display, so the mode is only set once
+        text = text_cache.render("Load saved game? (Y/N)", (255, 255, 255), 36)
+        while True:
+            self.screen.fill((20, 20, 20))
+            self.screen.blit(text, text.get_rect(center=(self.width // 2, self.height // 2)))
+            pygame.display.flip()
+            self.note_first_frame()
+            
+            for event in pygame.event.get():
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_y:
+                        return True
+                    elif event.key == pygame.K_n:
+                        return False
+                elif event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+
+
+
+    def save_game(self, path=SAVE_PATH, compress=None):
+        """Write the world as a versioned .npz of column arrays, one per attribute"""
+        compress = self.compress_saves if compress is None else compress
+        write_savegame(self.snapshot(), path, compress)
+
+
+
+    def snapshot(self):
+        """Copies of everything save_game writes, as arrays that later ticks leave alone"""
+        player = self.player
+        creatures = self.creatures
+        foods = self.foods
+        slots = foods.live_slots()
+        slots = slots[np.argsort(foods.uid[slots])]   # slots are reused, uids are not
+        arrays = {
+            'version': np.array(SAVE_VERSION),
+            'base_id': np.array(0),   # set when the save starts a journal
+            'map_size': np.array(self.map_size),
+            'player': np.array([player.x, player.y, player.level, player.nutrition, 
+                                player.hp, player.radius], dtype=float),
+            'next_bot_id': np.array(self.next_bot_id),
+            'creature_xy': np.array([(c.x, c.y) for c in creatures], dtype=float).reshape(-1, 2),
+            'creature_stats': np.array([(c.level, c.nutrition, c.hp, c.bot_id) for c in creatures],
+                                       dtype=np.int64).reshape(-1, 4),
+            'creature_color': np.array([c.color for c in creatures], dtype=np.uint8).reshape(-1, 3),
+            'food_x': foods.x[slots],
+            'food_y': foods.y[slots],
+            'food_nutrition': foods.nutrition[slots],
+            'food_size': foods.size[slots],
+            'food_points': foods.points[slots],
+            'food_point_count': foods.point_count[slots],
+            'food_uid': foods.uid[slots],
+            'obstacle_xy': np.array([(o.x, o.y) for o in self.obstacles], dtype=float).reshape(-1, 2),
+            'obstacle_size': np.array([o.size for o in self.obstacles], dtype=np.int32),
+            'obstacle_rectangle': np.array([o.shape == 'rectangle' for o in self.obstacles], dtype=bool),
+            'obstacle_color': np.array([o.color for o in self.obstacles], dtype=np.uint8).reshape(-1, 3),
+            'bot_color_ids': np.array(list(self.bot_colors.keys()), dtype=np.int64),
+            'bot_colors': np.array(list(self.bot_colors.values()), dtype=np.uint8).reshape(-1, 3),
+        }
+        return arrays
+
+
+
+    def autosave(self, autosaver):
+        """Hand a snapshot to the autosave thread, which does the compressing and writing"""
+        if self.journal:
+            autosaver.checkpoint(self.journal, self.snapshot())
+        else:
+            autosaver.submit(self.snapshot())
+
+
+
+    def clear_world(self, map_size):
+        """An empty world of map_size: no obstacles, foods or bots, the player at (0, 0)"""
+        self.map_size = map_size
+        self.tick = 0
+        self.killer_level = None
         
         # Create player first (will be positioned properly later)
         self.player = Player(0, 0)
+        self.leaderboard = Leaderboard()
+        self.leaderboard.add(self.player)
+        self.highscore_rows = None
+        self.highscore_panel = None
         
-        self.foods = []
+        self.foods = FoodStore()
         self.obstacles = []
+        self.obstacle_field = ObstacleField(self.obstacles, self.map_size)
         self.creatures = []
+        self.index_creatures()
         self.bot_colors = {}
         self.next_bot_id = 1
+
+
+
+    def index_creatures(self):
+        """Rebuild the bot arrays and the creature grid after self.creatures was replaced.
         
-        self.start_time = pygame.time.get_ticks()
-        self.food_eaten_count = 0
+        Both are then kept up to date bot by bot: moves, level ups, spawns and deaths
+        patch them, so a tick only touches the bots that change (see BotArrays).
+        """
+        self.creatures.sort(key=bot_order)
+        self.bots = BotArrays(self.creatures)
+        self.creature_grid = SpatialHash(order=bot_order)
+        for creature in self.creatures:
+            self.creature_grid.insert(creature, creature.radius)
+        self.moved_bots = []   # bots whose prev_x/prev_y still lag behind, see step()
+
+
+
+    def load_game(self):
+        """Load the binary save, or the old JSON one when that is all there is"""
+        path = find_savegame()
+        if path is None:
+            return False
+        if path.endswith('.json'):
+            return self.load_json(path)
+        return self.load_binary(path)
+
+
+
+    def load_binary(self, path=SAVE_PATH):
+        """Load a binary save plus whatever its journal recorded since"""
+        try:
+            with np.load(path) as data:
+                state = {name: data[name] for name in data.files}
+            if int(state['version']) > SAVE_VERSION:
+                raise ValueError(f"save version {int(state['version'])} is newer than this game")
+            if 'food_uid' not in state:   # version 1
+                state['food_uid'] = np.arange(len(state['food_x']))
+                state['base_id'] = np.array(0)
+            for delta in read_journal(journal_path(path), int(state['base_id'])):
+                apply_save_delta(state, delta)
+            self.restore(state)
+            return True
+        except Exception as e:
+            print(f"Error loading game: {e}")
+            return False
 
-        if self.should_load:
-            self.load_game()
-        else:
-            self.generate_obstacles(50)
-            # Update player position after obstacles are generated
-            safe_x, safe_y = self.find_safe_spawn_position(40)
-            self.player.x = safe_x
-            self.player.y = safe_y
-            self.generate_foods(200)  # Increased from 100 to 200
-            self.generate_creatures(self.MINIMUM_BOTS)
 
 
+    def restore(self, state):
+        """Rebuild the world from arrays as made by snapshot()"""
+        self.map_size = tuple(int(v) for v in state['map_size'].tolist())
 
-    def save_game(self):
+        x, y, level, nutrition, hp, radius = state['player'].tolist()
+        self.player.x = self.player.prev_x = x
+        self.player.y = self.player.prev_y = y
+        self.player.level = int(level)
+        self.player.nutrition = int(nutrition)
+        self.player.hp = int(hp)
+        self.player.radius = int(radius)
+
+        self.creatures = []
+        self.leaderboard = Leaderboard()
+        self.leaderboard.add(self.player)
+        for (x, y), (level, nutrition, hp, bot_id), color in zip(
+                state['creature_xy'].tolist(), state['creature_stats'].tolist(),
+                state['creature_color'].tolist()):
+            creature = Creature(x, y, level, bot_id, tuple(color))
+            creature.nutrition = nutrition
+            creature.hp = hp
+            self.creatures.append(creature)
+            self.leaderboard.add(creature)
+        self.index_creatures()
+
+        self.foods = FoodStore.from_arrays(
+            state['food_x'], state['food_y'], state['food_nutrition'], state['food_size'],
+            state['food_points'], state['food_point_count'], state['food_uid'])
+
+        self.obstacles = []
+        for (x, y), size, rectangle, color in zip(
+                state['obstacle_xy'].tolist(), state['obstacle_size'].tolist(),
+                state['obstacle_rectangle'].tolist(), state['obstacle_color'].tolist()):
+            obstacle = Obstacle(x, y, size, 'rectangle' if rectangle else 'circle')
+            obstacle.color = tuple(color)
+            self.obstacles.append(obstacle)
+        self.obstacle_field = ObstacleField(self.obstacles, self.map_size)
+
+        self.bot_colors = {bot_id: tuple(color) for bot_id, color in 
+                           zip(state['bot_color_ids'].tolist(), state['bot_colors'].tolist())}
+        self.next_bot_id = int(state['next_bot_id'])
+
+
+
+    def save_json(self, path=LEGACY_SAVE_PATH):
+        """The save format before SAVE_VERSION 1, kept for the save benchmark"""
         save_data = {
             'player': {
                 'x': self.player.x,
@@ -109,22 +399,19 @@ class Game:
             'next_bot_id': self.next_bot_id
         }
         
-        with open('mcr_savegame.json', 'w') as f:
+        with open(path, 'w') as f:
             json.dump(save_data, f)
 
 
 
-    def load_game(self):
-        if not os.path.exists('mcr_savegame.json'):
-            return False
-            
+    def load_json(self, path=LEGACY_SAVE_PATH):
         try:
-            with open('mcr_savegame.json', 'r') as f:
+            with open(path, 'r') as f:
                 save_data = json.load(f)
             
             # Load player
-            self.player.x = save_data['player']['x']
-            self.player.y = save_data['player']['y']
+            self.player.x = self.player.prev_x = save_data['player']['x']
+            self.player.y = self.player.prev_y = save_data['player']['y']
             self.player.level = save_data['player']['level']
             self.player.nutrition = save_data['player']['nutrition']
             self.player.hp = save_data['player']['hp']
@@ -132,6 +419,8 @@ class Game:
             
             # Load creatures
             self.creatures = []
+            self.leaderboard = Leaderboard()
+            self.leaderboard.add(self.player)
             for c_data in save_data['creatures']:
                 creature = Creature(c_data['x'], c_data['y'], 
                                  c_data['level'], c_data['bot_id'], 
@@ -139,20 +428,21 @@ class Game:
                 creature.nutrition = c_data['nutrition']
                 creature.hp = c_data['hp']
                 self.creatures.append(creature)
+                self.leaderboard.add(creature)
+            self.index_creatures()
             
             # Load foods
-            self.foods = []
+            self.foods = FoodStore()
             for f_data in save_data['foods']:
-                food = Food(f_data['x'], f_data['y'], f_data['nutrition'])
-                food.size = f_data['size']
-                food.points = [tuple(p) for p in f_data['points']]
-                self.foods.append(food)
+                self.foods.add(f_data['x'], f_data['y'], f_data['nutrition'],
+                               f_data['size'], f_data['points'])
             
             # Load obstacles
             self.obstacles = []
             for o_data in save_data['obstacles']:
                 self.obstacles.append(Obstacle(o_data['x'], o_data['y'], 
                                             o_data['size']))
+            self.obstacle_field = ObstacleField(self.obstacles, self.map_size)
             
             # Load other game state
             self.bot_colors = {int(k): tuple(v) for k, v in save_data['bot_colors'].items()}
@@ -166,7 +456,7 @@ class Game:
 
     def check_obstacle_placement(self, x, y, size, shape, existing_obstacles):
         """Check if a new obstacle can be placed here"""
-        MIN_GAP = 10  # Minimum gap between obstacles
+        MIN_GAP = self.MIN_GAP
         
         for obstacle in existing_obstacles:
             # Calculate the minimum required distance between obstacles
@@ -218,10 +508,34 @@ class Game:
 
 
     def generate_obstacles(self, count):
+        for _ in self.obstacle_generation(count):
+            pass
+
+
+
+    def obstacle_generation(self, count):
+        """generate_obstacles one obstacle (or a few attempts) at a time, yielding the fraction done.
+        
+        Placement is only checked against the obstacles in nearby cells of a spatial
+        hash, so the cost per attempt stays flat however many obstacles there are.
+        """
         map_area = self.map_size[0] * self.map_size[1]
         target_coverage = 0.06  # 6% coverage
         current_coverage = 0
         max_attempts = 1000
+        # Large obstacles average about 95000 px², and each takes a few attempts once
+        # the map fills up, so big maps get a budget in proportion to their area
+        large_attempts = max(max_attempts, int(4 * target_coverage * map_area / 95000))
+        
+        # Bounding radius of an obstacle (a rectangle's half diagonal is 1.25 * size)
+        placed = SpatialHash(cell_size=256)
+        def reach(size, shape):
+            return size * 1.25 if shape == 'rectangle' else size
+        def fits(x, y, size, shape):
+            nearby = placed.query(x, y, reach(size, shape) + self.MIN_GAP)
+            return self.check_obstacle_placement(x, y, size, shape, nearby)
+        for obstacle in self.obstacles:
+            placed.insert(obstacle, reach(obstacle.size, obstacle.shape))
         
         # Generate regular obstacles
         for _ in range(count):
@@ -232,147 +546,135 @@ class Game:
                 x = random.randint(size, self.map_size[0] - size)
                 y = random.randint(size, self.map_size[1] - size)
                 
-                if self.check_obstacle_placement(x, y, size, shape, self.obstacles):
+                if fits(x, y, size, shape):
                     obstacle = Obstacle(x, y, size, shape)
                     self.obstacles.append(obstacle)
+                    placed.insert(obstacle, reach(size, shape))
                     if shape == 'circle':
                         current_coverage += math.pi * size * size
                     else:
                         current_coverage += size * 2 * size * 1.5
                     break
                 attempts += 1
+            yield 0.5 * len(self.obstacles) / count
         
         # Generate large obstacles until we reach target coverage
         attempts = 0
-        while current_coverage / map_area < target_coverage and attempts < max_attempts:
+        while current_coverage / map_area < target_coverage and attempts < large_attempts:
             size = random.randint(150, 200)
             shape = random.choice(['circle', 'rectangle'])
             x = random.randint(size, self.map_size[0] - size)
             y = random.randint(size, self.map_size[1] - size)
             
-            if self.check_obstacle_placement(x, y, size, shape, self.obstacles):
+            if fits(x, y, size, shape):
                 obstacle = Obstacle(x, y, size, shape)
                 self.obstacles.append(obstacle)
+                placed.insert(obstacle, reach(size, shape))
                 if shape == 'circle':
                     current_coverage += math.pi * size * size
                 else:
                     current_coverage += size * 2 * size * 1.5
             
             attempts += 1
+            if attempts % 20 == 0:
+                yield 0.5 + 0.5 * min(1.0, current_coverage / map_area / target_coverage)
+        
+        # Obstacles never move, so bake them once for all movement and spawn checks
+        self.obstacle_field = ObstacleField(self.obstacles, self.map_size)
+        yield 1.0
             
 
 
+    def world_generation(self, obstacle_count, food_count, food_slice=500):
+        """Generate a new world in small steps, yielding the fraction done after each"""
+        for done in self.obstacle_generation(obstacle_count):
+            yield 0.6 * done
+        self.place_player()
+        for start in range(0, food_count, food_slice):
+            self.generate_foods(min(food_slice, food_count - start))
+            yield 0.6 + 0.35 * min(food_count, start + food_slice) / food_count
+        self.generate_creatures(self.MINIMUM_BOTS)
+        yield 1.0
+
+
+
     def generate_foods(self, count):
-            for _ in range(count):
-                while True:
-                    x = random.randint(0, self.map_size[0])
-                    y = random.randint(0, self.map_size[1])
-                    # Check if position overlaps with any obstacle
-                    valid_position = True
-                    for obstacle in self.obstacles:
-                        if check_collision(x, y, 15, obstacle.x, obstacle.y, obstacle.size):
-                            valid_position = False
-                            break
-                    if valid_position:
-                        break
-                
+            # Positions clear of every obstacle, all drawn at once
+            xs, ys = self.obstacle_field.free_points(15, count)
+            for x, y in zip(xs.tolist(), ys.tolist()):
                 # 70% chance for tiny food (5-10 NU), 30% chance for larger food
                 if random.random() < 0.7:
                     nutrition = random.randint(5, 10)
                 else:
                     nutrition = random.randint(11, 20)
-                self.foods.append(Food(x, y, nutrition))
+                self.foods.add(x, y, nutrition)
             
 
     def find_safe_spawn_position(self, min_distance_from_obstacles):
         """Find a spawn position that's away from all obstacles"""
-        max_attempts = 1000
-        attempts = 0
-        
-        while attempts < max_attempts:
-            x = random.randint(0, self.map_size[0])
-            y = random.randint(0, self.map_size[1])
-            
-            # Check distance from all obstacles
-            safe_position = True
-            for obstacle in self.obstacles:
-                # Add buffer distance to obstacle size
-                if check_collision(x, y, min_distance_from_obstacles, 
-                                 obstacle.x, obstacle.y, 
-                                 obstacle.size + min_distance_from_obstacles,
-                                 obstacle.shape):
-                    safe_position = False
-                    break
-                    
-            if safe_position:
-                return x, y
-                
-            attempts += 1
+        # Buffer added on both sides, as before
+        xs, ys = self.obstacle_field.free_points(2 * min_distance_from_obstacles, 1)
+        if len(xs):
+            return float(xs[0]), float(ys[0])
         
-        # If no position found after max attempts, find the position furthest from all obstacles
-        best_x, best_y = self.map_size[0]//2, self.map_size[1]//2
-        best_min_distance = 0
-        
-        for _ in range(100):
-            x = random.randint(0, self.map_size[0])
-            y = random.randint(0, self.map_size[1])
-            
-            min_distance = float('inf')
-            for obstacle in self.obstacles:
-                dist = math.sqrt((x - obstacle.x)**2 + (y - obstacle.y)**2) - obstacle.size
-                min_distance = min(min_distance, dist)
-            
-            if min_distance > best_min_distance:
-                best_min_distance = min_distance
-                best_x, best_y = x, y
-        
-        return best_x, best_y
+        # Nowhere has that much room: take the position furthest from all obstacles
+        return self.obstacle_field.roomiest_point()
 
 
 
     def generate_creatures(self, count):
-        attempts = 0
-        max_attempts = 100
-        spawned = 0
+        max_draws = 4
         min_distance_to_player = 800
         min_distance_to_obstacles = 40
-
-        while spawned < count and attempts < max_attempts:
-            # Find safe position away from obstacles
-            safe_x, safe_y = self.find_safe_spawn_position(min_distance_to_obstacles)
-            
-            # Check distance to player
-            distance_to_player = math.sqrt((safe_x - self.player.x)**2 + 
-                                         (safe_y - self.player.y)**2)
-            
-            if distance_to_player < min_distance_to_player:
-                attempts += 1
-                continue
-            
-            # Position is safe, spawn creature
+        
+        # Safe positions away from obstacles, drawn in batches; the few that land
+        # near the player are dropped and drawn again
+        spots_x, spots_y = [], []
+        for _ in range(max_draws):
+            if len(spots_x) >= count:
+                break
+            xs, ys = self.obstacle_field.free_points(2 * min_distance_to_obstacles,
+                                                     count - len(spots_x))
+            far = (xs - self.player.x)**2 + (ys - self.player.y)**2 >= min_distance_to_player**2
+            spots_x += xs[far].tolist()
+            spots_y += ys[far].tolist()
+        
+        # A crowded map may have no room that big (or only near the player): put the
+        # rest in the roomiest spot still far enough from the player. If there is none,
+        # they are skipped, and top_up_bots tries again on a later tick.
+        if len(spots_x) < count:
+            spot = self.obstacle_field.roomiest_point((self.player.x, self.player.y),
+                                                      min_distance_to_player)
+            if spot is not None:
+                spots_x += [float(spot[0])] * (count - len(spots_x))
+                spots_y += [float(spot[1])] * (count - len(spots_y))
+        
+        spawned = []
+        for safe_x, safe_y in zip(spots_x, spots_y):
             bot_id = self.next_bot_id
             self.next_bot_id += 1
             color = (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
             self.bot_colors[bot_id] = color
-            self.creatures.append(Creature(safe_x, safe_y, 1, bot_id, color))
-            spawned += 1
-            
-            attempts += 1
+            if self.creature_pool:
+                creature = self.creature_pool.pop()
+                creature.reset(safe_x, safe_y, 1, bot_id, color)
+            else:
+                creature = Creature(safe_x, safe_y, 1, bot_id, color)
+            self.creatures.append(creature)
+            self.creature_grid.insert(creature, creature.radius)
+            self.leaderboard.add(creature)
+            spawned.append(creature)
+        self.bots.append(spawned)
 
 
 
     def spawn_food(self):
         if random.random() < 0.4:  # Increased from 0.1 to 0.4 (40% chance per frame)
-            while True:
-                x = random.randint(0, self.map_size[0])
-                y = random.randint(0, self.map_size[1])
-                valid_position = True
-                for obstacle in self.obstacles:
-                    if check_collision(x, y, 15, obstacle.x, obstacle.y, obstacle.size):
-                        valid_position = False
-                        break
-                if valid_position:
-                    break
+            xs, ys = self.obstacle_field.free_points(15, 1)
+            if len(xs):
+                x, y = float(xs[0]), float(ys[0])
+            else:   # no room anywhere: the spot furthest from every obstacle
+                x, y = self.obstacle_field.roomiest_point()
             
             # Different spawn rates for different food sizes
             r = random.random()
@@ -382,142 +684,338 @@ class Game:
                 nutrition = random.randint(11, 15)
             else:
                 nutrition = random.randint(16, 20)
-            self.foods.append(Food(x, y, nutrition))
+            self.foods.add(x, y, nutrition)
 
 
 
-    def draw_world_border(self):
-        border_rect = pygame.Rect(-self.camera_offset[0], -self.camera_offset[1], 
-                                self.map_size[0], self.map_size[1])
-        pygame.draw.rect(self.screen, (50, 50, 50), border_rect, 2)
+    def top_up_bots(self):
+        # Maintain bot count
+        missing_bots = self.MINIMUM_BOTS - len(self.creatures)
+        if missing_bots > 0:
+            self.generate_creatures(missing_bots)
 
 
-            
-    def update_camera(self):
-        self.camera_offset[0] = self.player.x - self.width // 2
-        self.camera_offset[1] = self.player.y - self.height // 2
-        
 
-    def draw_radar(self):
-        radar_size = 200
-        radar_surface = pygame.Surface((radar_size, radar_size))
-        radar_surface.fill((0, 0, 0))
-        pygame.draw.rect(radar_surface, (50, 50, 50), (0, 0, radar_size, radar_size), 1)
+    def apply_bot_moves(self, target_x, target_y, moving, target_food=None):
+        movers = np.flatnonzero(moving)
+        if target_food is None:
+            target_food = np.full(len(self.creatures), -1, dtype=np.int64)
+        bots = self.bots
+        pool = self.planner_pool()
+        if pool is None:
+            move_bots(bots, movers, target_x, target_y, self.map_size, self.obstacle_field)
+        else:
+            pool.move(bots, movers, target_x, target_y, self.map_size, self.obstacle_field)
+        bots.target_food[movers] = target_food[movers]
         
-        scale_x = radar_size / self.map_size[0]
-        scale_y = radar_size / self.map_size[1]
+        # Food targets are store handles, not slots (see FoodStore.resolve)
+        creature_grid = self.creature_grid
+        moved = []
+        for i, x, y, handle in zip(movers.tolist(), bots.x[movers].tolist(), 
+                                   bots.y[movers].tolist(), target_food[movers].tolist()):
+            creature = self.creatures[i]
+            old_x, old_y = creature.x, creature.y
+            creature.x, creature.y = x, y
+            creature.target_food = handle if handle >= 0 else None
+            creature_grid.move(creature, old_x, old_y)
+            moved.append(creature)
+        self.moved_bots += moved
+
+
+
+    def update_camera(self, alpha=1.0):
+        player_x, player_y = interpolated_position(self.player, alpha)
+        self.camera_offset[0] = player_x - self.width // 2
+        self.camera_offset[1] = player_y - self.height // 2
         
-        # Draw obstacles with proper scaling
-        for obstacle in self.obstacles:
-            pos_x = int(obstacle.x * scale_x)
-            pos_y = int(obstacle.y * scale_y)
-            scaled_size = int(obstacle.size * scale_x)  # Scale the size too
-            pygame.draw.circle(radar_surface, (100, 100, 100), (pos_x, pos_y), scaled_size)
-            
-        # Draw player
-        player_radar_x = int(self.player.x * scale_x)
-        player_radar_y = int(self.player.y * scale_y)
-        pygame.draw.circle(radar_surface, (0, 255, 0), (player_radar_x, player_radar_y), 3)
+
+    def view_rect(self, margin):
+        """World-space rectangle seen by the camera, grown by margin on every side"""
+        return (self.camera_offset[0] - margin, self.camera_offset[1] - margin,
+                self.camera_offset[0] + self.width + margin, 
+                self.camera_offset[1] + self.height + margin)
+
+
+
+    def draw_visible_entities(self, alpha=1.0, margin=100):
+        """Draw only the foods and creatures near the viewport"""
+        left, top, right, bottom = self.view_rect(margin)
         
-        # Draw other creatures
-        for creature in self.creatures:
-            creature_x = int(creature.x * scale_x)
-            creature_y = int(creature.y * scale_y)
-            pygame.draw.circle(radar_surface, creature.color, (creature_x, creature_y), 2)
+        visible_foods = self.foods.in_rect(left, top, right, bottom)
+        self.foods.draw(self.screen, self.camera_offset, visible_foods)
+        self.profiler.mark('draw foods')
+        
+        # Bots moved a step since the grid was built, so the margin also covers that
+        visible_creatures = [c for c in self.creature_grid.query_rect(left, top, right, bottom)
+                             if left <= c.x <= right and top <= c.y <= bottom]
+        for creature in visible_creatures:
+            creature.draw(self.screen, self.camera_offset, alpha)
+        self.profiler.mark('draw bots')
         
-        self.screen.blit(radar_surface, (self.width - radar_size - 10, 10))
+        self.render_stats['foods'] = (len(visible_foods), len(self.foods) - len(visible_foods))
+        self.render_stats['bots'] = (len(visible_creatures), 
+                                     len(self.creatures) - len(visible_creatures))
+
+
+
+    def draw_render_stats(self):
+        drawn = sum(d for d, _ in self.render_stats.values())
+        skipped = sum(s for _, s in self.render_stats.values())
+        parts = [f"{name} {d}/{d + s}" for name, (d, s) in self.render_stats.items()]
+        cache = text_cache.stats()
+        text = (f"drawn {drawn}, skipped {skipped}  (" + ", ".join(parts) + ")"
+                f"  text cache {cache['hit_rate']:.0%} hits, {cache['size']} entries")
+        # Different every frame, so rendered directly: through the cache it would only
+        # push out the HUD and leaderboard surfaces
+        self.screen.blit(text_cache.font(24).render(text, True, (200, 200, 200)), 
+                         (10, self.height - 30))
+
+
+
+    def draw_radar(self):
+        self.radar.draw(self.screen, (self.width - self.radar.size - 10, 10), 
+                        self.creatures, self.player, pygame.time.get_ticks())
         
 
 
     def draw_highscore_table(self):
-        all_creatures = self.creatures + [self.player]
-        sorted_creatures = sorted(all_creatures, 
-                                key=lambda x: (x.level, x.nutrition), 
-                                reverse=True)[:10]
-        
-        start_y = 220
-        name_x = self.width - 200  # Fixed x position for names
-        bar_x = self.width - 100   # Fixed x position for all bars
-        bar_width = 50  # Fixed width for all bars
+        # The panel is only re-rendered when one of its rows actually changed
+        rows = self.leaderboard.rows()
+        if rows != self.highscore_rows:
+            self.highscore_rows = rows
+            self.highscore_panel = self.render_highscore_panel(rows)
+        self.screen.blit(self.highscore_panel, (self.width - 200, 220))
+
+
+
+    def render_highscore_panel(self, rows):
+        panel = pygame.Surface((200, 25 * Leaderboard.SIZE), pygame.SRCALPHA)
+        name_x = 0     # Fixed x position for names
+        bar_x = 100    # Fixed x position for all bars
+        bar_width = Leaderboard.BAR_WIDTH  # Fixed width for all bars
         bar_height = 5
         
-        for i, creature in enumerate(sorted_creatures):
-            font = pygame.font.Font(None, 24)
-            if isinstance(creature, Player):
-                text = f"player {creature.level}"
-                color = (0, 255, 0)
-            else:
-                text = f"bot{creature.bot_id} {creature.level}"
-                color = creature.color
-            
+        for i, (text, color, filled_width) in enumerate(rows):
             # Draw name and level at fixed position
-            text_surface = font.render(text, True, color)
-            self.screen.blit(text_surface, 
-                           (name_x, start_y + i * 25))
+            panel.blit(text_cache.render(text, color, 24), (name_x, i * 25))
             
-            # Draw progress bar at fixed position
-            required_nutrition = calculate_required_nutrition(creature.level)
-            progress = min(1.0, creature.nutrition / required_nutrition)  # Clamp to 1.0
-            
-            bar_y = start_y + i * 25 + 10
+            bar_y = i * 25 + 10
             
             # Background bar (grey)
-            pygame.draw.rect(self.screen, (50, 50, 50),
+            pygame.draw.rect(panel, (50, 50, 50),
                            (bar_x, bar_y, bar_width, bar_height))
             # Progress bar (colored)
-            filled_width = int(bar_width * progress)
-            pygame.draw.rect(self.screen, color,
+            pygame.draw.rect(panel, color,
                            (bar_x, bar_y, filled_width, bar_height))
+        return panel
+
+
+
+    def step(self, player_input=None):
+        """Advance the world by one tick.
+        
+        player_input is where the mouse would be relative to the screen centre, as (dx, dy),
+        or None to stand still. Returns True when the player got eaten (see killer_level).
+        """
+        profiler = self.profiler
+        # Remember where everything was, for drawing in between ticks
+        self.player.prev_x, self.player.prev_y = self.player.x, self.player.y
+        for creature in self.moved_bots:   # every other bot has stood still since
+            creature.prev_x, creature.prev_y = creature.x, creature.y
+        self.moved_bots = []
+        
+        self.top_up_bots()
+        profiler.mark('bot top-up')
+        
+        # Spawn new food
+        self.spawn_food()
+        profiler.mark('spawn food')
+        
+        self.player.move(player_input, self.map_size, self.obstacle_field)
+        profiler.mark('player move')
+        active = intervals = None
+        if self.lod:
+            active, intervals = self.lod.schedule(self.bots, self.player, self.tick)
+        if handle_collisions(self, active):  # Check if game over occurred
+            return True
+        profiler.mark('collisions')
+        
+        # Bot AI runs for all creatures at once, then each bot steps towards its target
+        if self.lod:   # collisions may have removed bots
+            active, intervals = self.lod.schedule(self.bots, self.player, self.tick)
+        plan = plan_bot_moves(self.bots, self.player, self.foods, active, intervals,
+                              self.planner_pool())
+        profiler.mark('bot AI')
+        self.apply_bot_moves(*plan)
+        profiler.mark('bot moves')
+        self.tick += 1
+        return False
+
+
+
+    def planner_pool(self):
+        """The BotPlannerPool for ai_workers, started on first use (None without workers)"""
+        if self.ai_pool is None and self.ai_workers:
+            self.ai_pool = BotPlannerPool(self.ai_workers)
+        return self.ai_pool
+
+
+    def close(self):
+        """Stop the AI worker processes and free their shared memory.
+        
+        Safe to call more than once; a later step() starts new workers.
+        """
+        if self.ai_pool is not None:
+            self.ai_pool.close()
+            self.ai_pool = None
+
+
+
+    def state_hash(self):
+        """Digest of the simulated world, for checking that a replay ended where the recording did"""
+        digest = hashlib.sha256()
+        player = self.player
+        digest.update(repr((self.tick, player.x, player.y, player.level, 
+                            player.nutrition, player.hp)).encode())
+        for creature in self.creatures:
+            digest.update(repr((creature.bot_id, creature.x, creature.y, creature.level,
+                                creature.nutrition, creature.hp)).encode())
+        slots = self.foods.live_slots()
+        for array in (self.foods.x, self.foods.y, self.foods.nutrition, self.foods.size):
+            digest.update(np.ascontiguousarray(array[slots]).tobytes())
+        return digest.digest()
+
+
+
+    def respawn_player(self):
+        """Replace an eaten player with a fresh level 1 one (used by headless runs)"""
+        self.leaderboard.remove(self.player)
+        self.player = Player(*self.find_safe_spawn_position(40))
+        self.leaderboard.add(self.player)
+        self.killer_level = None
+
+
+
+    def draw(self, alpha=1.0):
+        """alpha is how far the current frame lies between the last two ticks"""
+        self.screen.fill((20, 20, 20))
+        
+        # Obstacles and the world border come from cached tiles
+        tiles_drawn = self.static_layer.draw(self.screen, self.camera_offset)
+        self.profiler.mark('draw tiles')
+        self.draw_visible_entities(alpha)
+        self.render_stats['tiles'] = (tiles_drawn, 0)
+            
+        self.player.draw(self.screen, self.camera_offset, alpha)
+        self.profiler.mark('draw player')
+        self.draw_radar()
+        self.profiler.mark('radar')
+        self.draw_highscore_table()
+        self.profiler.mark('leaderboard')
+        if self.show_render_stats:
+            self.draw_render_stats()
+        if self.profiler.visible:
+            self.profiler.draw(self.screen, (10, self.height - 320))
+            self.profiler.mark('overlays')
 
 
 
     def run(self):
+        # A new world is generated a slice per frame, so something is on screen right away
+        while self.pending_generation is not None:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    self.close()
+                    pygame.quit()
+                    return
+            if not self.finish_generation(0.8 / (self.render_fps or 60)):
+                pygame.display.flip()
+                self.note_first_frame()
+                self.clock.tick(self.render_fps)
+        
+        # Fixed timestep: the world advances in ticks of tick_length no matter how fast
+        # frames are drawn, and frames show the world interpolated between two ticks
+        tick_length = 1.0 / self.tick_rate
+        accumulator = 0.0
+        previous_time = time.perf_counter()
+        
+        profiler = self.profiler
+        autosaver = None
+        if self.autosave_interval > 0 or self.journal:
+            autosaver = Autosaver(compress=self.compress_saves)
+        next_autosave = previous_time + self.autosave_interval
         while self.running:
-            current_time = pygame.time.get_ticks()
+            profiler.begin_frame()
+            now = time.perf_counter()
+            accumulator += now - previous_time
+            previous_time = now
             
             for event in pygame.event.get():
                 if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
-                    self.save_game()  # Auto-save on exit
+                    if self.journal:
+                        self.autosave(autosaver)   # on exit too, only what changed is written
+                        autosaver.close()
+                    else:
+                        if autosaver:
+                            autosaver.close()   # so a late autosave cannot overwrite this one
+                        self.save_game()  # Auto-save on exit
+                    autosaver = None
                     self.running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.show_render_stats = not self.show_render_stats
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+                    profiler.toggle()
+                    profiler.begin_frame()
             
-            # Maintain bot count
-            missing_bots = self.MINIMUM_BOTS - len(self.creatures)
-            if missing_bots > 0:
-                self.generate_creatures(missing_bots)
-            
-            # Spawn new food
-            self.spawn_food()
-            
-            keys = pygame.key.get_pressed()
-            self.player.move(keys, self.map_size, self.obstacles)
-            if handle_collisions(self):  # Check if game over occurred
-                return  # Exit the game loop if game is over
-            
-            self.update_camera()
+            mouse_x, mouse_y = pygame.mouse.get_pos()
+            pointer = (mouse_x - self.width // 2, mouse_y - self.height // 2)
+            profiler.mark('events')
+            steps = 0
+            while accumulator >= tick_length and steps < self.max_catchup_steps:
+                if self.input_recording is not None:
+                    self.input_recording.append(pointer)
+                if self.step(pointer):
+                    if self.recorder:
+                        # The fatal tick's frame goes in first, it is the one that matters
+                        self.recorder.record(self, profiler.end_frame())
+                        self.recorder.dump_recent()
+                    if autosaver:
+                        autosaver.close()
+                    # A dead game is over: an autosave from just before must not bring it back
+                    remove_savegame()
+                    self.close()
+                    self.show_game_over_screen(self.killer_level)
+                    return  # Exit the game loop if game is over
+                accumulator -= tick_length
+                steps += 1
+            if steps == self.max_catchup_steps:
+                # Too far behind to catch up: let the game slow down instead of spiralling
+                accumulator = min(accumulator, tick_length)
             
-            self.screen.fill((20, 20, 20))
-            
-            self.draw_world_border()
-            
-            for obstacle in self.obstacles:
-                obstacle.draw(self.screen, self.camera_offset)
+            if autosaver and self.autosave_interval > 0 and now >= next_autosave:
+                self.autosave(autosaver)
+                next_autosave = now + self.autosave_interval
+                profiler.mark('autosave')
             
-            for food in self.foods:
-                food.draw(self.screen, self.camera_offset)
-                
-            for creature in self.creatures:
-                # Updated method call with all required parameters
-                creature.move_towards_food(self.map_size, self.obstacles, self.foods, 
-                                        self.creatures, self.player)
-                creature.draw(self.screen, self.camera_offset)
-                
-            self.player.draw(self.screen, self.camera_offset)
-            self.draw_radar()
-            self.draw_highscore_table()
+            alpha = accumulator / tick_length
+            self.update_camera(alpha)
+            self.draw(alpha)
             
             pygame.display.flip()
-            self.clock.tick(60)
+            profiler.mark('flip')
+            if 'playing_ms' not in self.startup_times:
+                self.report_startup()
+            self.clock.tick(self.render_fps)
+            profiler.mark('wait')
+            frame = profiler.end_frame()
+            if self.recorder:
+                self.recorder.record(self, frame)
             
+        if self.recorder:
+            self.recorder.dump_recent()   # after the last frame was recorded
+        if autosaver:
+            autosaver.close()
+        self.close()
         pygame.quit()
 
 
@@ -535,8 +1033,8 @@ class Game:
         self.screen.blit(overlay, (0, 0))
         
         # Prepare text
-        font_large = pygame.font.Font(None, 74)
-        font_small = pygame.font.Font(None, 36)
+        font_large = text_cache.font(74)
+        font_small = text_cache.font(36)
         
         texts = [
             (font_large.render("GAME OVER", True, (255, 0, 0)), 0),
@@ -570,9 +1068,14 @@ class Game:
 
 
 class Player:
+    __slots__ = ('x', 'y', 'prev_x', 'prev_y', 'level', 'nutrition', 'hp', 'speed',
+                 'base_radius', 'radius', 'dead_zone')
+    
     def __init__(self, x, y):
         self.x = x
         self.y = y
+        self.prev_x = x   # position at the previous tick, for interpolated drawing
+        self.prev_y = y
         self.level = 1
         self.nutrition = 0
         self.hp = 100
@@ -588,13 +1091,11 @@ class Player:
 
 
 
-    def move(self, keys, map_size, obstacles):
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        center_x = pygame.display.get_surface().get_width() // 2
-        center_y = pygame.display.get_surface().get_height() // 2
-        
-        dx = mouse_x - center_x
-        dy = mouse_y - center_y
+    def move(self, pointer, map_size, obstacle_field):
+        """pointer is the mouse position relative to the screen centre, or None"""
+        if pointer is None:
+            return
+        dx, dy = pointer
         distance = math.sqrt(dx**2 + dy**2)
         
         if distance > self.dead_zone:
@@ -603,7 +1104,7 @@ class Player:
             new_y = self.y + math.sin(angle) * self.speed
             
             # Use the new sliding movement
-            self.x, self.y = move_with_sliding(self, new_x, new_y, obstacles)
+            self.x, self.y = move_with_sliding(self, new_x, new_y, obstacle_field)
             
             # Keep within map bounds
             self.x = max(self.radius, min(map_size[0] - self.radius, self.x))
@@ -611,155 +1112,702 @@ class Player:
 
         
 
-    def draw(self, screen, camera_offset):
-        pos_x = int(self.x - camera_offset[0])
-        pos_y = int(self.y - camera_offset[1])
+    def draw(self, screen, camera_offset, alpha=1.0):
+        x, y = interpolated_position(self, alpha)
+        pos_x = int(x - camera_offset[0])
+        pos_y = int(y - camera_offset[1])
         pygame.draw.circle(screen, (0, 255, 0), (pos_x, pos_y), self.radius)
         
-        font = pygame.font.Font(None, 24)
-        level_text = font.render(str(self.level), True, (255, 255, 255))
+        level_text = text_cache.render(str(self.level), (255, 255, 255), 24)
         text_rect = level_text.get_rect(center=(pos_x, pos_y))
         screen.blit(level_text, text_rect)
 
 
 
-class Food:
-    def __init__(self, x, y, nutrition):
-        self.x = x
-        self.y = y
-        self.nutrition = nutrition
-        self.size = 10 + nutrition
-        self.points = self.generate_polygon()
-        self.color = (100 + nutrition * 5, 50, 50)
-        
-    def generate_polygon(self):
-        points = []
-        num_points = random.randint(3, 6)
+def make_food_polygon_bank(count=256, seed=0):
+    """Unit food shapes: 3 to 6 evenly spaced corners, each at radius 0.8 to 1.2"""
+    rng = random.Random(seed)   # its own generator, so the bank never shifts the world's RNG
+    bank = np.zeros((count, 6, 2))
+    corners = np.zeros(count, dtype=np.int8)
+    for shape in range(count):
+        num_points = rng.randint(3, 6)
         for i in range(num_points):
             angle = 2 * math.pi * i / num_points
-            r = random.uniform(0.8, 1.2) * self.size
-            x = self.x + r * math.cos(angle)
-            y = self.y + r * math.sin(angle)
-            points.append((x, y))
-        return points
-        
-    def draw(self, screen, camera_offset):
-        adjusted_points = [(x - camera_offset[0], y - camera_offset[1]) for x, y in self.points]
-        pygame.draw.polygon(screen, self.color, adjusted_points)
+            r = rng.uniform(0.8, 1.2)
+            bank[shape, i] = (r * math.cos(angle), r * math.sin(angle))
+        corners[shape] = num_points
+    return bank, corners
 
 
-class Obstacle:
-    def __init__(self, x, y, size, shape='circle'):
-        self.x = x
-        self.y = y
-        self.size = size
-        self.shape = shape
-        if shape == 'rectangle':
-            self.width = size * 2
-            self.height = size * 1.5
-        else:
-            self.width = self.height = size
-        
-        # Generate random grey or brown color
-        color_type = random.choice(['grey', 'brown'])
-        if color_type == 'grey':
-            base = random.randint(80, 120)
-            self.color = (base, base, base)
-        else:
-            self.color = (
-                random.randint(100, 139),  # R
-                random.randint(60, 99),    # G
-                random.randint(20, 59)     # B
-            )
+FOOD_POLYGONS, FOOD_POLYGON_CORNERS = make_food_polygon_bank()
+
+
+def generate_food_polygon(x, y, size):
+    """A random shape from the bank, scaled to size and moved to (x, y), as a (corners, 2) array"""
+    shape = random.randrange(len(FOOD_POLYGONS))
+    return FOOD_POLYGONS[shape, :FOOD_POLYGON_CORNERS[shape]] * size + (x, y)
+
+
+
+class Food:
+    """Thin view of one slot of a FoodStore"""
+    __slots__ = ('store', 'index')
     
-    def draw(self, screen, camera_offset):
-        pos_x = int(self.x - camera_offset[0])
-        pos_y = int(self.y - camera_offset[1])
-        if self.shape == 'circle':
-            pygame.draw.circle(screen, self.color, (pos_x, pos_y), self.size)
-        else:
-            rect = pygame.Rect(
-                pos_x - self.width//2,
-                pos_y - self.height//2,
-                self.width,
-                self.height
-            )
-            pygame.draw.rect(screen, self.color, rect)
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
 
+    @property
+    def x(self):
+        return float(self.store.x[self.index])
 
+    @property
+    def y(self):
+        return float(self.store.y[self.index])
 
-class Creature:
-    def __init__(self, x, y, level, bot_id, color):
+    @property
+    def nutrition(self):
+        return int(self.store.nutrition[self.index])
+
+    @property
+    def size(self):
+        return float(self.store.size[self.index])
+
+    @property
+    def points(self):
+        count = self.store.point_count[self.index]
+        return [tuple(p) for p in self.store.points[self.index, :count].tolist()]
+
+    @property
+    def color(self):
+        return (100 + self.nutrition * 5, 50, 50)
+
+
+
+class FoodStore:
+    """All foods as contiguous NumPy arrays (structure of arrays) with an alive mask.
+    
+    A food keeps its slot for as long as it lives. remove() only marks the slot dead;
+    flush_removals() hands the dead slots back once per tick and add() reuses them
+    before growing the arrays. handle() names a food by slot and generation, so a
+    handle to an eaten food resolves to None instead of to the slot's next food.
+    """
+    MAX_POINTS = 6
+    
+    def __init__(self, capacity=256, cell_size=64):
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.nutrition = np.zeros(capacity, dtype=np.int32)
+        self.size = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.points = np.zeros((capacity, self.MAX_POINTS, 2))
+        self.point_count = np.zeros(capacity, dtype=np.int8)
+        self.uid = np.zeros(capacity, dtype=np.int64)   # never reused, unlike slots
+        self.generation = np.zeros(capacity, dtype=np.int64)   # bumped when a slot is freed
+        self.next_uid = 0
+        self.used = 0    # slots [0, used) have been handed out
+        self.count = 0   # foods still alive
+        self.max_size = 0
+        self.free = []       # freed slots, reused last in first out
+        self.removed = []    # eaten this tick, freed by flush_removals()
+        
+        # Cell index over the foods marked in indexed, sorted by cell key. Foods
+        # added later are looked up separately until the index is rebuilt; a freed slot
+        # loses its mark, so its stale entry is skipped even once the slot is reused.
+        self.cell_size = cell_size
+        self.indexed = np.zeros(capacity, dtype=bool)
+        self.recent = {}     # slots added since the last rebuild, in order
+        self.stale = 0       # index entries freed since the last rebuild
+        self.sorted_keys = np.zeros(0, dtype=np.int64)
+        self.sorted_slots = np.zeros(0, dtype=np.int64)
+
+
+    def __len__(self):
+        return self.count
+
+
+    def __iter__(self):
+        for index in np.flatnonzero(self.alive[:self.used]).tolist():
+            yield Food(self, index)
+
+
+    def live_slots(self):
+        return np.flatnonzero(self.alive[:self.used])
+
+
+    def handle(self, index):
+        """Stable name for the food in a slot, valid until that food is removed"""
+        return int(self.generation[index]) << 32 | index
+
+
+    def handles(self, slots):
+        return self.generation[slots] << 32 | slots
+
+
+    def resolve(self, handle):
+        """Slot of the food a handle names, or None once it has been eaten"""
+        if handle is None or handle < 0:
+            return None
+        index = handle & 0xFFFFFFFF
+        if index < self.used and self.alive[index] and self.generation[index] == handle >> 32:
+            return index
+        return None
+
+
+    @classmethod
+    def from_arrays(cls, x, y, nutrition, size, points, point_count, uid=None):
+        """A store filled in one go, e.g. from a save; points is (count, MAX_POINTS, 2)"""
+        count = len(x)
+        store = cls(capacity=max(256, count))
+        store.x[:count] = x
+        store.y[:count] = y
+        store.nutrition[:count] = nutrition
+        store.size[:count] = size
+        store.alive[:count] = True
+        store.points[:count] = points
+        store.point_count[:count] = point_count
+        store.uid[:count] = np.arange(count) if uid is None else uid
+        store.next_uid = int(store.uid[:count].max()) + 1 if count else 0
+        store.used = store.count = count
+        store.max_size = float(np.max(size)) if count else 0
+        store._rebuild_index()
+        return store
+
+
+    SHARED = ('x', 'y', 'nutrition', 'alive', 'generation', 'indexed', 
+              'sorted_keys', 'sorted_slots')
+
+
+    def share(self, shared):
+        """Move the query state into SharedArrays; returns the rest that from_shared needs.
+        
+        Only the first call (and the first after the arrays grow or the index is rebuilt)
+        copies anything: the store then works on the shared arrays in place.
+        """
+        self._refresh_index()   # so a view never has to rebuild the index itself
+        for name in self.SHARED:
+            setattr(self, name, shared.adopt('food_' + name, getattr(self, name)))
+        shared.put('food_recent', self._recent_slots())
+        return {'used': self.used, 'count': self.count, 'stale': self.stale,
+                'cell_size': self.cell_size, 'max_size': self.max_size}
+
+
+    def unshare(self):
+        for name in self.SHARED:
+            setattr(self, name, getattr(self, name).copy())
+
+
+    @classmethod
+    def from_shared(cls, arrays, info):
+        """Read-only store over arrays attached from a share(); queries work, changes don't"""
+        store = cls.__new__(cls)
+        for name in cls.SHARED:
+            setattr(store, name, arrays['food_' + name])
+        store.recent = dict.fromkeys(arrays['food_recent'].tolist())
+        for name, value in info.items():
+            setattr(store, name, value)
+        return store
+
+
+    def _grow(self):
+        capacity = len(self.x) * 2
+        for name in ('x', 'y', 'nutrition', 'size', 'alive', 'points', 'point_count', 'uid',
+                     'generation', 'indexed'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+
+    def add(self, x, y, nutrition, size=None, points=None):
+        if size is None:
+            size = 10 + nutrition
+        if points is None:
+            points = generate_food_polygon(x, y, size)
+        
+        if self.free:
+            index = self.free.pop()
+        else:
+            if self.used == len(self.x):
+                self._grow()
+            index = self.used
+            self.used += 1
+        self.count += 1
+        self.x[index] = x
+        self.y[index] = y
+        self.nutrition[index] = nutrition
+        self.size[index] = size
+        self.alive[index] = True
+        self.points[index, :len(points)] = points
+        self.point_count[index] = len(points)
+        self.uid[index] = self.next_uid
+        self.next_uid += 1
+        self.recent[index] = None
+        if size > self.max_size:
+            self.max_size = size
+        return index
+
+
+    def draw(self, screen, camera_offset, slots, chunk=16):
+        """Draw the foods in slots as polygons, without a view object per food.
+        
+        Converted a chunk at a time: thousands of point lists alive at once would set
+        off the garbage collector over and over.
+        """
+        for start in range(0, len(slots), chunk):
+            part = slots[start:start + chunk]
+            points = (self.points[part] - camera_offset).tolist()
+            colors = (100 + self.nutrition[part] * 5).tolist()
+            for polygon, corners, red in zip(points, self.point_count[part].tolist(), colors):
+                pygame.draw.polygon(screen, (red, 50, 50), polygon[:corners])
+
+
+    def remove(self, index):
+        """Mark a food eaten; its slot stays out of use until flush_removals()"""
+        if self.alive[index]:
+            self.alive[index] = False
+            self.count -= 1
+            self.removed.append(index)
+
+
+    def flush_removals(self):
+        """Free the slots removed since the last call (once per tick), invalidating their handles"""
+        if not self.removed:
+            return
+        removed = np.array(self.removed)
+        self.generation[removed] += 1
+        self.stale += int(np.count_nonzero(self.indexed[removed]))
+        self.indexed[removed] = False
+        self.free.extend(self.removed)
+        self.removed = []
+
+
+    def _rebuild_index(self):
+        slots = self.live_slots()
+        self.sorted_keys, self.sorted_slots = build_cell_index(
+            self.x[slots], self.y[slots], slots, self.cell_size)
+        self.indexed[:] = False
+        self.indexed[slots] = True
+        self.recent = {}
+        self.stale = 0
+
+
+    def _refresh_index(self):
+        if len(self.recent) > max(256, self.count // 8) or self.stale > max(1024, self.count):
+            self._rebuild_index()
+
+
+    def _recent_slots(self):
+        return np.fromiter(self.recent, dtype=np.int64, count=len(self.recent))
+
+
+    def in_rect(self, left, top, right, bottom):
+        """Slots of the living foods whose centre lies inside a rectangle"""
+        self._refresh_index()
+        
+        # Each column of cells is one contiguous run of sorted keys
+        columns = np.arange(int(left // self.cell_size), int(right // self.cell_size) + 1)
+        low = np.searchsorted(self.sorted_keys, cell_key(columns, int(top // self.cell_size)), 'left')
+        high = np.searchsorted(self.sorted_keys, cell_key(columns, int(bottom // self.cell_size)), 'right')
+        runs = [self.sorted_slots[l:h] for l, h in zip(low.tolist(), high.tolist()) if h > l]
+        slots = np.concatenate(runs) if runs else self.sorted_slots[:0]
+        slots = np.concatenate([slots[self.indexed[slots]], self._recent_slots()])
+        
+        x = self.x[slots]
+        y = self.y[slots]
+        keep = self.alive[slots] & (x >= left) & (x <= right) & (y >= top) & (y <= bottom)
+        return slots[keep]
+
+
+    def near_pairs(self, xs, ys, reach):
+        """All (query, slot) pairs where a living food lies in a cell within reach of a point.
+        
+        Candidates only; the caller does the exact distance test on the returned arrays.
+        """
+        self._refresh_index()
+        
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        query_ids, slots = query_cell_index(self.sorted_keys, self.sorted_slots,
+                                            xs, ys, reach, self.cell_size)
+        keep = self.indexed[slots]
+        query_ids, slots = query_ids[keep], slots[keep]
+        
+        # Foods added since the last index rebuild get a small index of their own,
+        # with each query's pairs kept in the order the foods were added
+        recent = self._recent_slots()
+        if len(recent):
+            keys, order = build_cell_index(self.x[recent], self.y[recent],
+                                           np.arange(len(recent)), self.cell_size)
+            recent_ids, added = query_cell_index(keys, order, xs, ys, reach, self.cell_size)
+            first = np.lexsort((added, recent_ids))
+            query_ids = np.concatenate([query_ids, recent_ids[first]])
+            slots = np.concatenate([slots, recent[added[first]]])
+        
+        keep = self.alive[slots]
+        return query_ids[keep], slots[keep]
+
+
+
+class Obstacle:
+    __slots__ = ('x', 'y', 'size', 'shape', 'width', 'height', 'color')
+    
+    def __init__(self, x, y, size, shape='circle'):
         self.x = x
         self.y = y
-        self.level = level
-        self.nutrition = 0
-        self.hp = 100
-        self.speed = 9  # 90% of player speed
-        self.base_radius = 15
-        self.radius = self.base_radius + level
-        self.direction = random.uniform(0, 2 * math.pi)
-        self.direction_timer = 0
-        self.direction_change_interval = 60
-        self.bot_id = bot_id
-        self.color = color
-        self.target_food = None
-
+        self.size = size
+        self.shape = shape
+        if shape == 'rectangle':
+            self.width = size * 2
+            self.height = size * 1.5
+        else:
+            self.width = self.height = size
         
+        # Generate random grey or brown color
+        color_type = random.choice(['grey', 'brown'])
+        if color_type == 'grey':
+            base = random.randint(80, 120)
+            self.color = (base, base, base)
+        else:
+            self.color = (
+                random.randint(100, 139),  # R
+                random.randint(60, 99),    # G
+                random.randint(20, 59)     # B
+            )
+    
+    def draw(self, screen, camera_offset):
+        pos_x = int(self.x - camera_offset[0])
+        pos_y = int(self.y - camera_offset[1])
+        if self.shape == 'circle':
+            pygame.draw.circle(screen, self.color, (pos_x, pos_y), self.size)
+        else:
+            rect = pygame.Rect(
+                pos_x - self.width//2,
+                pos_y - self.height//2,
+                self.width,
+                self.height
+            )
+            pygame.draw.rect(screen, self.color, rect)
 
-    def find_nearest_food(self, foods):
-        current_max_nutrition = calculate_required_nutrition(self.level) / 1.5
-        valid_foods = [f for f in foods if f.nutrition <= current_max_nutrition]
+
+
+class ObstacleField:
+    """Obstacles baked once into a grid of closest-obstacle distances, for exact hit tests
+    in one lookup and for picking spawn points with enough room"""
+    def __init__(self, obstacles, map_size, cell_size=None, max_distance=160, margin=64,
+                 block_size=32, free_levels=(15, 80), max_cells=16000000, max_cell_size=22):
+        self.obstacles = obstacles
+        self.map_size = map_size
+        if cell_size is None:
+            # 8px cells, or coarser ones on maps big enough to need more than max_cells
+            area = (map_size[0] + 2 * margin) * (map_size[1] + 2 * margin)
+            cell_size = min(max_cell_size, max(8, int(math.ceil(math.sqrt(area / max_cells)))))
+        self.cell_size = cell_size
+        self.max_distance = max_distance   # distances are only baked up to this far
+        self.margin = margin               # the grid reaches a bit past the map border
+        self.slack = cell_size * math.sqrt(2) / 2   # worst error of sampling a cell centre
         
-        if not valid_foods:
-            return None
+        columns = int(math.ceil((map_size[0] + 2 * margin) / cell_size))
+        rows = int(math.ceil((map_size[1] + 2 * margin) / cell_size))
+        self.distance = np.full((rows, columns), float(max_distance), dtype=np.float32)
+        self.owner = np.full((rows, columns), -1, dtype=np.int32)
+        
+        windows = []
+        for index, obstacle in enumerate(obstacles):
+            reach = obstacle.size + max_distance
+            col0, row0 = self.cell_of(obstacle.x - reach, obstacle.y - reach)
+            col1, row1 = self.cell_of(obstacle.x + reach, obstacle.y + reach)
+            centre_x = (np.arange(col0, col1 + 1) + 0.5) * cell_size - margin - obstacle.x
+            centre_y = (np.arange(row0, row1 + 1) + 0.5) * cell_size - margin - obstacle.y
+            if obstacle.shape == 'circle':
+                dist = np.hypot(centre_x[None, :], centre_y[:, None]) - obstacle.size
+            else:
+                dist = np.maximum(np.abs(centre_x)[None, :], np.abs(centre_y)[:, None]) - obstacle.size
             
-        nearest_food = min(valid_foods, 
-                          key=lambda f: math.sqrt((f.x - self.x)**2 + (f.y - self.y)**2))
+            window = (slice(row0, row1 + 1), slice(col0, col1 + 1))
+            closer = dist < self.distance[window]
+            self.distance[window][closer] = dist[closer]
+            self.owner[window][closer] = index
+            windows.append((window, dist))
         
-        # Only target food within a reasonable range
-        distance = math.sqrt((nearest_food.x - self.x)**2 + (nearest_food.y - self.y)**2)
-        if distance < 300:  # Visible range
-            return nearest_food
+        # Cells where another obstacle comes within 2 * slack of the closest one
+        # (a little more, for the float32 rounding of distance)
+        near_cells, near_ids = [], []
+        for index, (window, dist) in enumerate(windows):
+            owner = self.owner[window]
+            near = (dist <= self.distance[window] + 2 * self.slack + 0.01) & (owner != index) & (owner >= 0)
+            if near.any():
+                rows_near, columns_near = np.nonzero(near)
+                near_cells.append((rows_near + window[0].start) * columns + columns_near + window[1].start)
+                near_ids.append(np.full(len(rows_near), index, dtype=np.int32))
+        self.shared_start = np.zeros(1, dtype=np.int64)
+        self.shared_ids = np.zeros(0, dtype=np.int32)
+        if near_cells:
+            cells = np.concatenate(near_cells)
+            shared = np.unique(cells)
+            cells = np.concatenate([cells, shared])
+            ids = np.concatenate(near_ids + [self.owner.ravel()[shared]])
+            order = np.lexsort((ids, cells))   # by cell, then in list order
+            cells, self.shared_ids = cells[order], ids[order]
+            self.shared_start = np.append(np.searchsorted(cells, shared), len(cells))
+            self.owner.ravel()[shared] = -2 - np.arange(len(shared), dtype=np.int32)
+        
+        # Blocks of whole cells tiling the map from the first cell inside it
+        block = max(1, int(round(block_size / cell_size)))
+        start = int(math.ceil(margin / cell_size))
+        self.block_origin = start * cell_size - margin
+        self.block_step = block * cell_size
+        block_columns = max(0, int((map_size[0] - self.block_origin) // self.block_step))
+        block_rows = max(0, int((map_size[1] - self.block_origin) // self.block_step))
+        cells = self.distance[start:start + block_rows * block, start:start + block_columns * block]
+        self.block_room = (cells - self.slack).reshape(
+            block_rows, block, block_columns, block).min(axis=(1, 3))
+        self.free_blocks = {}
+        for clearance in free_levels:   # food and bot spawns, ready before the first tick
+            self.blocks_with_room(clearance)
+
+
+    def cell_of(self, x, y):
+        """Grid column and row of a point, clamped to the grid"""
+        col = int((x + self.margin) // self.cell_size)
+        row = int((y + self.margin) // self.cell_size)
+        return (min(max(col, 0), self.distance.shape[1] - 1),
+                min(max(row, 0), self.distance.shape[0] - 1))
+
+
+    def hit(self, x, y, radius):
+        """First obstacle a circle at (x, y) collides with (as check_collision), or None"""
+        inside = (-self.margin <= x < self.distance.shape[1] * self.cell_size - self.margin and
+                  -self.margin <= y < self.distance.shape[0] * self.cell_size - self.margin)
+        if not inside or radius + self.slack >= self.max_distance:
+            # Too far out for the baked grid: check every obstacle like before
+            for obstacle in self.obstacles:
+                if check_collision(x, y, radius, obstacle.x, obstacle.y,
+                                 obstacle.size, obstacle.shape):
+                    return obstacle
+            return None
+        
+        col, row = self.cell_of(x, y)
+        distance = float(self.distance[row, col])
+        if distance - self.slack >= radius:
+            return None
+        if radius > distance + self.slack:
+            # Deep enough that obstacles outside the cell's list may collide too,
+            # and one of them could come first in list order
+            candidates = self.obstacles
+        else:
+            owner = int(self.owner[row, col])
+            if owner >= 0:
+                candidates = (self.obstacles[owner],)
+            else:
+                group = -2 - owner
+                ids = self.shared_ids[self.shared_start[group]:self.shared_start[group + 1]]
+                candidates = [self.obstacles[index] for index in ids.tolist()]
+        for obstacle in candidates:
+            if check_collision(x, y, radius, obstacle.x, obstacle.y, obstacle.size, obstacle.shape):
+                return obstacle
         return None
 
 
-    def find_nearest_target(self, foods, creatures, player):
-        current_max_nutrition = calculate_required_nutrition(self.level) / 1.5
+    SHARED = ('distance', 'owner', 'shared_start', 'shared_ids')
+
+
+    def share(self, shared):
+        """Move the grid into SharedArrays and add the obstacles; returns the rest that
+        from_shared needs. Nothing here changes later, so one call per field does."""
+        for name in self.SHARED:
+            setattr(self, name, shared.adopt('field_' + name, getattr(self, name)))
+        obstacles = self.obstacles
+        shared.put('field_obstacle_xy', np.array([(o.x, o.y) for o in obstacles], 
+                                                 dtype=float).reshape(-1, 2))
+        shared.put('field_obstacle_size', np.array([o.size for o in obstacles], dtype=float))
+        shared.put('field_obstacle_rectangle', 
+                   np.array([o.shape == 'rectangle' for o in obstacles], dtype=bool))
+        return {'map_size': self.map_size, 'cell_size': self.cell_size, 'margin': self.margin,
+                'max_distance': self.max_distance, 'slack': self.slack}
+
+
+    def unshare(self):
+        for name in self.SHARED:
+            setattr(self, name, getattr(self, name).copy())
+
+
+    @classmethod
+    def from_shared(cls, arrays, info):
+        """Field over arrays attached from a share(), for hit tests (no spawn blocks)"""
+        field = cls.__new__(cls)
+        for name in cls.SHARED:
+            setattr(field, name, arrays['field_' + name])
+        for name, value in info.items():
+            setattr(field, name, value)
+        field.obstacles = [Obstacle(x, y, size, 'rectangle' if rectangle else 'circle')
+                           for (x, y), size, rectangle in zip(
+                               arrays['field_obstacle_xy'].tolist(),
+                               arrays['field_obstacle_size'].tolist(),
+                               arrays['field_obstacle_rectangle'].tolist())]
+        return field
+
+
+    def blocks_with_room(self, clearance):
+        """Flat indices of the blocks where every point is at least clearance from all obstacles"""
+        blocks = self.free_blocks.get(clearance)
+        if blocks is None:
+            if clearance + self.slack >= self.max_distance:
+                raise ValueError(f"clearance {clearance} is beyond the baked distance {self.max_distance}")
+            blocks = np.flatnonzero(self.block_room >= clearance).astype(np.int32)
+            self.free_blocks[clearance] = blocks
+        return blocks
+
+
+    def free_points(self, clearance, count):
+        """x and y arrays of count random points with at least clearance room around them.
         
-        # First, look for smaller creatures (including player)
-        potential_prey = []
-        if player.level < self.level:
-            potential_prey.append(player)
-        for creature in creatures:
-            if creature != self and creature.level < self.level:
-                potential_prey.append(creature)
+        Uniform over the free part of the map at O(1) per point; empty when no block has
+        that much room. Draws from the random module, so seeded runs repeat.
+        """
+        blocks = self.blocks_with_room(clearance)
+        if len(blocks) == 0 or count <= 0:
+            return np.zeros(0), np.zeros(0)
+        rng = np.random.default_rng(random.getrandbits(64))
+        rows, columns = np.divmod(blocks[rng.integers(len(blocks), size=count)],
+                                  self.block_room.shape[1])
+        x = self.block_origin + (columns + rng.random(count)) * self.block_step
+        y = self.block_origin + (rows + rng.random(count)) * self.block_step
+        return x, y
+
+
+    def roomiest_point(self, away_from=None, min_distance=0):
+        """Centre of the block furthest from every obstacle (the map centre if there is none).
+        With away_from, only blocks at least min_distance from it count, and None if none do."""
+        room = self.block_room
+        if room.size == 0:
+            x, y = self.map_size[0] / 2, self.map_size[1] / 2
+            if away_from is not None and math.dist((x, y), away_from) < min_distance:
+                return None
+            return x, y
+        if away_from is not None:
+            rows, columns = np.indices(room.shape)
+            far = ((self.block_origin + (columns + 0.5) * self.block_step - away_from[0])**2 +
+                   (self.block_origin + (rows + 0.5) * self.block_step - away_from[1])**2
+                   >= min_distance**2)
+            if not far.any():
+                return None
+            room = np.where(far, room, room.min() - 1)
+        row, column = np.unravel_index(np.argmax(room), room.shape)
+        return (self.block_origin + (column + 0.5) * self.block_step,
+                self.block_origin + (row + 0.5) * self.block_step)
+
+
+
+class StaticWorldLayer:
+    """Obstacles and the world border pre-rendered into tiles that cover map_size.
+    
+    A tile is rendered the first time it comes into view and then only blitted.
+    Tiles with nothing on them are never created, and the least recently seen tiles
+    are dropped past max_tiles so big maps don't hold the whole world in memory.
+    """
+    def __init__(self, obstacles, map_size, screen_size, tile_size=512, background=(20, 20, 20)):
+        self.map_size = map_size
+        self.tile_size = tile_size
+        self.background = background
+        self.tiles = OrderedDict()
+        visible = (screen_size[0] // tile_size + 2) * (screen_size[1] // tile_size + 2)
+        self.max_tiles = visible * 3
         
-        if potential_prey:
-            nearest_prey = min(potential_prey, 
-                              key=lambda p: math.sqrt((p.x - self.x)**2 + (p.y - self.y)**2))
-            distance = math.sqrt((nearest_prey.x - self.x)**2 + (nearest_prey.y - self.y)**2)
-            if distance < 300:  # Detection range
-                return nearest_prey, True  # True indicates it's a creature
+        # Which obstacles touch which tile
+        self.tile_obstacles = {}
+        for obstacle in obstacles:
+            half_w = max(obstacle.size, obstacle.width / 2) + 1
+            half_h = max(obstacle.size, obstacle.height / 2) + 1
+            for tx in range(int((obstacle.x - half_w) // tile_size), 
+                            int((obstacle.x + half_w) // tile_size) + 1):
+                for ty in range(int((obstacle.y - half_h) // tile_size), 
+                                int((obstacle.y + half_h) // tile_size) + 1):
+                    self.tile_obstacles.setdefault((tx, ty), []).append(obstacle)
         
-        # If no prey found, look for food
-        valid_foods = [f for f in foods if f.nutrition <= current_max_nutrition]
-        if valid_foods:
-            nearest_food = min(valid_foods, 
-                              key=lambda f: math.sqrt((f.x - self.x)**2 + (f.y - self.y)**2))
-            return nearest_food, False  # False indicates it's food
+        # The border runs along the outermost tiles
+        last_x = (map_size[0] - 1) // tile_size
+        last_y = (map_size[1] - 1) // tile_size
+        self.border_tiles = set()
+        for tx in range(last_x + 1):
+            self.border_tiles.update({(tx, 0), (tx, last_y)})
+        for ty in range(last_y + 1):
+            self.border_tiles.update({(0, ty), (last_x, ty)})
+
+
+    def render_tile(self, tx, ty):
+        origin = (tx * self.tile_size, ty * self.tile_size)
+        tile = pygame.Surface((self.tile_size, self.tile_size)).convert()
+        tile.fill(self.background)
         
-        return None, False
+        if (tx, ty) in self.border_tiles:
+            border_rect = pygame.Rect(-origin[0], -origin[1], self.map_size[0], self.map_size[1])
+            pygame.draw.rect(tile, (50, 50, 50), border_rect, 2)
+        for obstacle in self.tile_obstacles.get((tx, ty), []):
+            obstacle.draw(tile, origin)
+        return tile
 
 
-    def should_flee(self, threat, distance_threshold=200):
-        if threat.level > self.level:
-            distance = math.sqrt((threat.x - self.x)**2 + (threat.y - self.y)**2)
-            return distance < distance_threshold
-        return False
+    def draw(self, screen, camera_offset):
+        size = self.tile_size
+        first_x = int(camera_offset[0] // size)
+        first_y = int(camera_offset[1] // size)
+        last_x = int((camera_offset[0] + screen.get_width()) // size)
+        last_y = int((camera_offset[1] + screen.get_height()) // size)
+        
+        drawn = 0
+        for tx in range(first_x, last_x + 1):
+            for ty in range(first_y, last_y + 1):
+                key = (tx, ty)
+                if key not in self.tile_obstacles and key not in self.border_tiles:
+                    continue   # nothing but background here
+                tile = self.tiles.get(key)
+                if tile is None:
+                    tile = self.tiles[key] = self.render_tile(tx, ty)
+                    if len(self.tiles) > self.max_tiles:
+                        self.tiles.popitem(last=False)
+                else:
+                    self.tiles.move_to_end(key)
+                screen.blit(tile, (int(tx * size - camera_offset[0]), 
+                                   int(ty * size - camera_offset[1])))
+                drawn += 1
+        return drawn
+
+
+
+class Creature:
+    FLEE_DISTANCE = 200   # bigger creatures closer than this are fled from
+    HUNT_RANGE = 300      # smaller creatures closer than this are chased
+    __slots__ = ('x', 'y', 'prev_x', 'prev_y', 'level', 'nutrition', 'hp', 'speed',
+                 'base_radius', 'radius', 'direction', 'direction_timer', 
+                 'direction_change_interval', 'bot_id', 'color', 'target_food')
+    
+    def __init__(self, x, y, level, bot_id, color):
+        self.reset(x, y, level, bot_id, color)
+
+
+    def reset(self, x, y, level, bot_id, color):
+        """(Re)initialise every field, so a pooled creature comes back as good as new"""
+        self.x = x
+        self.y = y
+        self.prev_x = x   # position at the previous tick, for interpolated drawing
+        self.prev_y = y
+        self.level = level
+        self.nutrition = 0
+        self.hp = 100
+        self.speed = 9  # 90% of player speed
+        self.base_radius = 15
+        self.radius = self.base_radius + level
+        self.direction = random.uniform(0, 2 * math.pi)
+        self.direction_timer = 0
+        self.direction_change_interval = 60
+        self.bot_id = bot_id
+        self.color = color
+        self.target_food = None
 
+        
 
-    def move_random(self, map_size, obstacles):
+    def move_random(self, map_size, obstacle_field):
         self.direction_timer += 1
         if self.direction_timer >= self.direction_change_interval:
             self.direction = random.uniform(0, 2 * math.pi)
@@ -770,11 +1818,9 @@ class Creature:
         
         # Check collision with obstacles
         can_move = True
-        for obstacle in obstacles:
-            if check_collision(new_x, new_y, self.radius, obstacle.x, obstacle.y, obstacle.size):
-                can_move = False
-                self.direction = random.uniform(0, 2 * math.pi)
-                break
+        if obstacle_field.hit(new_x, new_y, self.radius) is not None:
+            can_move = False
+            self.direction = random.uniform(0, 2 * math.pi)
         
         if can_move:
             self.x = new_x
@@ -785,61 +1831,977 @@ class Creature:
 
 
 
-    def move_towards_food(self, map_size, obstacles, foods, creatures, player):
-        # Check for threats first
-        threats = [c for c in creatures if c.level > self.level]
-        if player.level > self.level:
-            threats.append(player)
+    def draw(self, screen, camera_offset, alpha=1.0):
+        x, y = interpolated_position(self, alpha)
+        pos_x = int(x - camera_offset[0])
+        pos_y = int(y - camera_offset[1])
+        pygame.draw.circle(screen, self.color, (pos_x, pos_y), self.radius)
         
-        # Calculate movement vector
-        target_x, target_y = None, None
+        level_text = text_cache.render(str(self.level), (255, 255, 255), 24)
+        text_rect = level_text.get_rect(center=(pos_x, pos_y))
+        screen.blit(level_text, text_rect)
+
+
+
+def bot_order(creature):
+    """Sort key that puts bots in Game.creatures order (bots are appended in bot_id order)"""
+    return creature.bot_id
+
+
+
+class BotArrays:
+    """x, y, level, radius, speed, bot_id and target_food of every bot as arrays, in
+    Game.creatures order.
+    
+    The bot objects stay the real state. These copies are patched where a bot changes
+    (Game.apply_bot_moves, a level up in handle_collisions, spawns and deaths) instead
+    of being gathered from every bot each tick, so with SimulationLOD a tick only touches
+    the bots that update. Each field is the first count rows of a bigger column, which
+    grows by doubling and always has a row to spare for the player (see with_player).
+    bot_id rises along the list, so find() can search it.
+    """
+    FIELDS = {'x': float, 'y': float, 'level': np.int64, 'radius': np.int64, 'speed': float,
+              'bot_id': np.int64, 'target_food': np.int64}
+    
+    def __init__(self, creatures=()):
+        self.count = 0
+        self.columns = {name: np.zeros(16, dtype) for name, dtype in self.FIELDS.items()}
+        self.append(creatures)
+
+
+    def __len__(self):
+        return self.count
+
+
+    def _view(self):
+        for name, column in self.columns.items():
+            setattr(self, name, column[:self.count])
+
+
+    def append(self, creatures):
+        """Add bots just appended to Game.creatures"""
+        start, end = self.count, self.count + len(creatures)
+        capacity = len(self.columns['x'])
+        if end + 1 > capacity:
+            capacity = max(2 * capacity, end + 1)
+            for name, column in self.columns.items():
+                self.columns[name] = np.zeros(capacity, column.dtype)
+                self.columns[name][:start] = column[:start]
+        columns = self.columns
+        columns['x'][start:end] = [c.x for c in creatures]
+        columns['y'][start:end] = [c.y for c in creatures]
+        columns['level'][start:end] = [c.level for c in creatures]
+        columns['radius'][start:end] = [c.radius for c in creatures]
+        columns['speed'][start:end] = [c.speed for c in creatures]
+        columns['bot_id'][start:end] = [c.bot_id for c in creatures]
+        columns['target_food'][start:end] = [-1 if c.target_food is None else c.target_food 
+                                             for c in creatures]
+        self.count = end
+        self._view()
+
+
+    def find(self, creatures):
+        """Indices of these bots in Game.creatures"""
+        return np.searchsorted(self.bot_id, [c.bot_id for c in creatures])
+
+
+    def delete(self, indices):
+        keep = np.ones(self.count, dtype=bool)
+        keep[indices] = False
+        kept = int(np.count_nonzero(keep))
+        for column in self.columns.values():
+            column[:kept] = column[:self.count][keep]
+        self.count = kept
+        self._view()
+
+
+    def with_player(self, player=None):
+        """x, y and level with the player as an extra last row (written when given)"""
+        columns = self.columns
+        if player is not None:
+            columns['x'][self.count] = player.x
+            columns['y'][self.count] = player.y
+            columns['level'][self.count] = player.level
+        rows = self.count + 1
+        return columns['x'][:rows], columns['y'][:rows], columns['level'][:rows]
+
+
+    def share(self, shared):
+        """Move the columns into SharedArrays (see FoodStore.share)"""
+        for name, column in self.columns.items():
+            self.columns[name] = shared.adopt('bot_' + name, column)
+        self._view()
+        return {'count': self.count}
+
+
+    def unshare(self):
+        for name, column in self.columns.items():
+            self.columns[name] = column.copy()
+        self._view()
+
+
+    @classmethod
+    def from_shared(cls, arrays, info):
+        bots = cls.__new__(cls)
+        bots.count = info['count']
+        bots.columns = {name: arrays['bot_' + name] for name in cls.FIELDS}
+        bots._view()
+        return bots
+
+
+
+class SpatialHash:
+    """Uniform cell grid for finding entities near a point without scanning all of them.
+    
+    With an order key every cell keeps its entities sorted by it, so queries return
+    them in the same order however they were inserted and moved.
+    """
+    def __init__(self, cell_size=128, order=None):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.order = order
+        self.max_radius = 0   # largest entity radius inserted, widens every query
         
-        # Flee from nearest threat if necessary
-        for threat in threats:
-            if self.should_flee(threat):
-                dx = self.x - threat.x
-                dy = self.y - threat.y
-                dist = math.sqrt(dx*dx + dy*dy)
-                if dist > 0:
-                    target_x = self.x + (dx/dist) * self.speed
-                    target_y = self.y + (dy/dist) * self.speed
-                    break
+
+    def cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+
+    def clear(self):
+        self.cells.clear()
+        self.max_radius = 0
+
+
+    def insert(self, entity, radius):
+        bucket = self.cells.setdefault(self.cell_of(entity.x, entity.y), [])
+        bucket.append(entity)
+        if self.order and len(bucket) > 1 and self.order(bucket[-2]) > self.order(entity):
+            bucket.sort(key=self.order)
+        self.grow(radius)
+
+
+    def grow(self, radius):
+        """Note that an entity got bigger (max_radius never shrinks, queries just cover more)"""
+        if radius > self.max_radius:
+            self.max_radius = radius
+
+
+    def move(self, entity, old_x, old_y):
+        """Refile an entity that moved from (old_x, old_y) to its current position"""
+        size = self.cell_size
+        old_key = (int(old_x // size), int(old_y // size))
+        if old_key == (int(entity.x // size), int(entity.y // size)):
+            return
+        bucket = self.cells[old_key]
+        bucket.remove(entity)
+        if not bucket:
+            del self.cells[old_key]
+        self.insert(entity, 0)
+
+
+    def remove(self, entity):
+        key = self.cell_of(entity.x, entity.y)
+        bucket = self.cells.get(key)
+        if bucket and entity in bucket:
+            bucket.remove(entity)
+            if not bucket:
+                del self.cells[key]
+
+
+    def query(self, x, y, radius):
+        """Return all entities that could overlap a circle at (x, y)"""
+        return self.query_rect(x - radius, y - radius, x + radius, y + radius)
+
+
+    def query_rect(self, left, top, right, bottom):
+        """Return all entities that could overlap a rectangle"""
+        reach = self.max_radius
+        min_cx, min_cy = self.cell_of(left - reach, top - reach)
+        max_cx, max_cy = self.cell_of(right + reach, bottom + reach)
         
-        # If not fleeing, move towards target
-        if target_x is None:
-            target, is_creature = self.find_nearest_target(foods, creatures, player)
-            if target:
-                dx = target.x - self.x
-                dy = target.y - self.y
-                dist = math.sqrt(dx*dx + dy*dy)
-                if dist > 0:
-                    target_x = self.x + (dx/dist) * self.speed
-                    target_y = self.y + (dy/dist) * self.speed
-            else:
-                # Random movement if no target
-                angle = random.uniform(0, 2 * math.pi)
-                target_x = self.x + math.cos(angle) * self.speed
-                target_y = self.y + math.sin(angle) * self.speed
-        
-        if target_x is not None and target_y is not None:
-            # Use exactly the same movement and collision handling as player
-            new_x, new_y = move_with_sliding(self, target_x, target_y, obstacles)
-            
-            # Apply border constraints
-            self.x = max(self.radius, min(map_size[0] - self.radius, new_x))
-            self.y = max(self.radius, min(map_size[1] - self.radius, new_y))
+        found = []
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+
 
+class Radar:
+    """Minimap: obstacles rendered once, creature dots refreshed every refresh_interval ms.
+    
+    With more than density_threshold bots the dots become a density image built with
+    NumPy and copied in through surfarray, so the cost stays flat as bots are added.
+    """
+    def __init__(self, obstacles, map_size, size=200, refresh_interval=100, density_threshold=300):
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.density_threshold = density_threshold
+        self.scale_x = size / map_size[0]
+        self.scale_y = size / map_size[1]
+        self.last_refresh = None
+        
+        self.background = pygame.Surface((size, size))
+        self.background.fill((0, 0, 0))
+        pygame.draw.rect(self.background, (50, 50, 50), (0, 0, size, size), 1)
+        # Draw obstacles with proper scaling
+        for obstacle in obstacles:
+            pos_x = int(obstacle.x * self.scale_x)
+            pos_y = int(obstacle.y * self.scale_y)
+            scaled_size = int(obstacle.size * self.scale_x)  # Scale the size too
+            pygame.draw.circle(self.background, (100, 100, 100), (pos_x, pos_y), scaled_size)
         
+        self.dots = pygame.Surface((size, size))
+        self.dots.set_colorkey((0, 0, 0))
+
+
+    def refresh_dots(self, creatures):
+        self.dots.fill((0, 0, 0))
+        if len(creatures) > self.density_threshold:
+            xs = np.array([c.x for c in creatures]) * self.scale_x
+            ys = np.array([c.y for c in creatures]) * self.scale_y
+            # 2x2 pixel bins, so single bots are still visible
+            counts, _, _ = np.histogram2d(xs, ys, bins=self.size // 2, 
+                                          range=[[0, self.size], [0, self.size]])
+            counts = counts.repeat(2, axis=0).repeat(2, axis=1)
+            heat = np.where(counts > 0, np.minimum(120 + counts * 45, 255), 0).astype(np.uint8)
+            image = np.zeros((self.size, self.size, 3), dtype=np.uint8)
+            image[..., 0] = heat
+            image[..., 1] = heat // 2
+            image[..., 2] = heat // 4
+            pygame.surfarray.blit_array(self.dots, image)
+        else:
+            for creature in creatures:
+                creature_x = int(creature.x * self.scale_x)
+                creature_y = int(creature.y * self.scale_y)
+                pygame.draw.circle(self.dots, creature.color, (creature_x, creature_y), 2)
 
-    def draw(self, screen, camera_offset):
-        pos_x = int(self.x - camera_offset[0])
-        pos_y = int(self.y - camera_offset[1])
-        pygame.draw.circle(screen, self.color, (pos_x, pos_y), self.radius)
+
+    def draw(self, screen, position, creatures, player, now):
+        if self.last_refresh is None or now - self.last_refresh >= self.refresh_interval:
+            self.refresh_dots(creatures)
+            self.last_refresh = now
         
-        font = pygame.font.Font(None, 24)
-        level_text = font.render(str(self.level), True, (255, 255, 255))
-        text_rect = level_text.get_rect(center=(pos_x, pos_y))
-        screen.blit(level_text, text_rect)
+        screen.blit(self.background, position)
+        screen.blit(self.dots, position)
+        # The player dot moves every frame, so it is drawn live
+        player_radar_x = position[0] + int(player.x * self.scale_x)
+        player_radar_y = position[1] + int(player.y * self.scale_y)
+        pygame.draw.circle(screen, (0, 255, 0), (player_radar_x, player_radar_y), 3)
+
+
+
+class Leaderboard:
+    """Player and bots kept sorted by (level, nutrition) as they change.
+    
+    handle_collisions and the spawn code report every eat, kill and spawn, so nothing
+    is re-sorted per frame. Ties keep spawn order with the player last, like the old
+    stable sort of creatures + [player].
+    """
+    SIZE = 10
+    BAR_WIDTH = 50   # progress bars are compared in whole pixels
+    
+    def __init__(self):
+        self.keys = []        # sorted (-level, -nutrition, is_player, seq)
+        self.key_of = {}      # entity -> its current key
+        self.entity_of = {}   # seq -> entity
+        self.next_seq = 0
+        self.dirty = True
+        self.cached_rows = []
+
+
+    def sort_key(self, entity, seq):
+        return (-entity.level, -entity.nutrition, isinstance(entity, Player), seq)
+
+
+    def add(self, entity):
+        key = self.sort_key(entity, self.next_seq)
+        self.next_seq += 1
+        bisect.insort(self.keys, key)
+        self.key_of[entity] = key
+        self.entity_of[key[3]] = entity
+        self.dirty = True
+
+
+    def remove(self, entity):
+        key = self.key_of.pop(entity, None)
+        if key is None:
+            return
+        del self.keys[bisect.bisect_left(self.keys, key)]
+        del self.entity_of[key[3]]
+        self.dirty = True
+
+
+    def update(self, entity):
+        """Re-rank an entity after its level or nutrition changed"""
+        old_key = self.key_of.get(entity)
+        if old_key is None:
+            return
+        new_key = self.sort_key(entity, old_key[3])
+        if new_key != old_key:
+            del self.keys[bisect.bisect_left(self.keys, old_key)]
+            bisect.insort(self.keys, new_key)
+            self.key_of[entity] = new_key
+        self.dirty = True
+
+
+    def top(self):
+        return [self.entity_of[key[3]] for key in self.keys[:self.SIZE]]
+
+
+    def rows(self):
+        """(text, color, filled bar width) per displayed entry; recomputed only after a change"""
+        if self.dirty:
+            self.dirty = False
+            self.cached_rows = []
+            for creature in self.top():
+                if isinstance(creature, Player):
+                    text = f"player {creature.level}"
+                    color = (0, 255, 0)
+                else:
+                    text = f"bot{creature.bot_id} {creature.level}"
+                    color = creature.color
+                required_nutrition = calculate_required_nutrition(creature.level)
+                progress = min(1.0, creature.nutrition / required_nutrition)  # Clamp to 1.0
+                self.cached_rows.append((text, color, int(self.BAR_WIDTH * progress)))
+        return self.cached_rows
+
+
+
+class TextCache:
+    """Shared fonts plus a bounded LRU of rendered text surfaces keyed by (text, color, size)"""
+    def __init__(self, max_entries=512):
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+
+    def render(self, text, color, size):
+        key = (text, color, size)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        self.misses += 1
+        surface = self.surfaces[key] = self.font(size).render(text, True, color)
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self.surfaces), 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+text_cache = TextCache()
+
+
+
+class FrameProfiler:
+    """Per-phase frame timings plus a rolling stacked graph of them.
+    
+    Every mark() charges the time since the previous mark to a phase; phases hit
+    more than once per frame (catch-up ticks) add up. Timings are collected while the
+    graph is visible or a FlightRecorder needs them (recording); otherwise mark()
+    returns straight away, so the calls can stay in the game loop for good.
+    """
+    COLORS = [(230, 80, 80), (240, 160, 60), (230, 220, 80), (120, 210, 90), (60, 190, 170),
+              (70, 150, 240), (150, 110, 240), (220, 100, 220), (180, 180, 180), (120, 90, 60)]
+    
+    def __init__(self, history=240, graph_height=120, pixels_per_ms=3):
+        self.enabled = False
+        self.visible = False
+        self.recording = False
+        self.phases = []        # in the order they were first seen, which fixes the stacking
+        self.colors = {}
+        self.current = {}
+        self.last = 0.0
+        self.frames = 0
+        self.history = history
+        self.totals = {}        # per-phase sums over the frames still on the graph
+        self.recent = []
+        self.pixels_per_ms = pixels_per_ms
+        self.graph = pygame.Surface((history, graph_height))
+        self.legend = []
+        self.legend_lines = ([], None)   # rendered legend, and the legend it shows
+
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.enabled = self.visible or self.recording
+        self.recent, self.totals, self.legend = [], {}, []
+        self.graph.fill((0, 0, 0))
+
+
+    def set_recording(self, recording):
+        self.recording = recording
+        self.enabled = self.visible or recording
+
+
+    def begin_frame(self):
+        if self.enabled:
+            self.current = {}
+            self.last = time.perf_counter()
+
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0.0) + now - self.last
+        self.last = now
+
+
+    def end_frame(self):
+        """Close the frame and return its phase timings in seconds (None while disabled)"""
+        if not self.enabled:
+            return None
+        frame = self.current
+        if self.visible:
+            self.add_to_graph(frame)
+        return frame
+
+
+    def add_to_graph(self, frame):
+        for phase, seconds in frame.items():
+            if phase not in self.colors:
+                self.colors[phase] = self.COLORS[len(self.phases) % len(self.COLORS)]
+                self.phases.append(phase)
+                if 'wait' in self.phases:   # idle time stays on top of the stack
+                    self.phases.remove('wait')
+                    self.phases.append('wait')
+            self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+        self.recent.append(frame)
+        if len(self.recent) > self.history:
+            for phase, seconds in self.recent.pop(0).items():
+                self.totals[phase] -= seconds
+        
+        # Scroll the graph one pixel and draw only the new column
+        width, height = self.graph.get_size()
+        self.graph.scroll(-1, 0)
+        pygame.draw.line(self.graph, (0, 0, 0), (width - 1, 0), (width - 1, height))
+        y = height
+        for phase in self.phases:
+            bar = frame.get(phase, 0.0) * 1000 * self.pixels_per_ms
+            if bar >= 0.5 and y > 0:
+                pygame.draw.line(self.graph, self.colors[phase], 
+                                 (width - 1, y - 1), (width - 1, max(0, round(y - bar))))
+                y -= bar
+        
+        self.frames += 1
+        if not self.legend or self.frames % 30 == 0:
+            self.legend = self.averages()
+
+
+    def averages(self):
+        """Mean milliseconds per frame for every phase, over the frames on the graph"""
+        count = max(1, len(self.recent))
+        return [(phase, self.totals.get(phase, 0.0) * 1000 / count) for phase in self.phases]
+
+
+    def draw(self, screen, position):
+        x, y = position
+        width, height = self.graph.get_size()
+        screen.blit(self.graph, (x, y))
+        budget_y = y + height - round(1000 / 60 * self.pixels_per_ms)   # a 60 FPS frame
+        pygame.draw.line(screen, (255, 255, 255), (x, budget_y), (x + width - 1, budget_y))
+        
+        # The numbers change every refresh, so the lines are kept here, not in text_cache
+        lines, shown = self.legend_lines
+        if shown is not self.legend:
+            font = text_cache.font(20)
+            total = sum(ms for _, ms in self.legend)
+            lines = [font.render(f"frame {total:.1f} ms", True, (255, 255, 255))]
+            lines += [font.render(f"{phase} {ms:.1f}", True, self.colors[phase])
+                      for phase, ms in self.legend]
+            self.legend_lines = (lines, self.legend)
+        for i, line in enumerate(lines):
+            screen.blit(line, (x + width + 10, y + 16 * i))
+
+
+
+class FlightRecorder:
+    """Ring buffer of the last few seconds of frames, written to disk around slow frames.
+    
+    Every record holds a frame's phase timings (from FrameProfiler) and entity counts.
+    A frame slower than spike_ms gets dumped with the context frames before and after
+    it, once those are in; dump_recent() writes the whole buffer, e.g. on exit.
+    """
+    def __init__(self, capacity=600, spike_ms=100.0, context=60, prefix='mcr_flight'):
+        self.frames = deque(maxlen=capacity)
+        self.spike_ms = spike_ms
+        self.context = min(context, capacity // 2)
+        self.prefix = prefix
+        self.frame_number = 0
+        self.spike = None           # the frame record a pending dump is about
+        self.frames_to_wait = 0
+        self.started = time.perf_counter()
+        self.dumps = []
+
+
+    def record(self, game, phases):
+        frame_ms = sum(phases.values()) * 1000
+        self.frames.append({
+            'frame': self.frame_number,
+            'tick': game.tick,
+            'time': round(time.perf_counter() - self.started, 4),
+            'frame_ms': round(frame_ms, 3),
+            'phases_ms': {phase: round(seconds * 1000, 3) for phase, seconds in phases.items()},
+            'foods': len(game.foods),
+            'bots': len(game.creatures),
+            'obstacles': len(game.obstacles),
+        })
+        self.frame_number += 1
+        
+        # Spikes close together end up in one dump, named after the first of them
+        if self.spike is None:
+            if frame_ms > self.spike_ms:
+                self.spike = self.frames[-1]
+                self.frames_to_wait = self.context
+        else:
+            self.frames_to_wait -= 1
+            if self.frames_to_wait <= 0:
+                window = list(self.frames)[-(2 * self.context + 1):]
+                self.dump(f"{self.prefix}_spike_{self.spike['frame']}.json", 'spike', window)
+                self.spike = None
+
+
+    def dump_recent(self):
+        """Write everything still in the buffer, including a spike that is still pending"""
+        self.dump(f"{self.prefix}_exit.json", 'exit', list(self.frames))
+        self.spike = None
+
+
+    def dump(self, path, reason, frames):
+        record = {'reason': reason, 'spike_ms': self.spike_ms, 'frames': frames}
+        if self.spike is not None:
+            record['spike_frame'] = self.spike['frame']
+        with open(path, 'w') as f:
+            json.dump(record, f)
+        self.dumps.append(path)
+
+
+
+class SimulationLOD:
+    """Lets bots far from the player think, move and fight less often.
+    
+    The map is split into square regions. Bots within full_radius regions of the
+    player's region (diagonals count as one) update every tick; farther out the update
+    interval doubles every full_radius regions, up to max_interval. A bot then covers
+    the ticks it skipped in one bigger step. Bots are spread over the ticks by bot_id, so
+    the work per tick stays level, and regions are worked out from the positions every
+    tick, so crossing into another region only changes the interval.
+    """
+    def __init__(self, region_size=1024, full_radius=2, max_interval=4):
+        self.region_size = region_size
+        self.full_radius = full_radius
+        self.max_interval = max_interval
+
+
+    def intervals(self, xs, ys, player):
+        """How many ticks apart bots at these positions are updated"""
+        size = self.region_size
+        ring = np.maximum(np.abs(xs // size - player.x // size), 
+                          np.abs(ys // size - player.y // size))
+        interval = np.ones(len(xs), dtype=np.int64)
+        far = ring > self.full_radius
+        doublings = np.ceil(np.log2(ring[far] / self.full_radius)).astype(np.int64)
+        interval[far] = np.minimum(self.max_interval, 2 ** doublings)
+        return interval
+
+
+    def schedule(self, bots, player, tick):
+        """Mask of the bots (a BotArrays) that update this tick, and how many ticks each update covers"""
+        interval = self.intervals(bots.x, bots.y, player)
+        return (tick + bots.bot_id) % interval == 0, interval
+
+
+
+class InputRecording:
+    """A session's seed, world settings and per-tick player input, enough to replay it.
+    
+    The file is a fixed header (HEADER: magic, version, seed, map size, minimum bots,
+    tick count, FLAG_ bits and the final state_hash) followed by the zlib-compressed
+    int16 pointer offsets, two per tick; standing still is stored as STILL.
+    Version 1 files, from before the flags, still load.
+    """
+    MAGIC = b'MCRR'
+    VERSION = 2
+    HEADER = struct.Struct('<4sHqIIIII32s')
+    HEADER_V1 = struct.Struct('<4sHqIIII32s')
+    FLAG_LOD = 1
+    STILL = -32768
+    
+    def __init__(self, seed, map_size, minimum_bots, lod=False):
+        self.seed = seed
+        self.map_size = tuple(map_size)
+        self.minimum_bots = minimum_bots
+        self.lod = lod
+        self.inputs = []
+        self.final_hash = bytes(32)
+
+
+    def append(self, pointer):
+        if pointer is None:
+            self.inputs.append((self.STILL, self.STILL))
+        else:
+            self.inputs.append((max(-32767, min(32767, int(pointer[0]))),
+                                max(-32767, min(32767, int(pointer[1])))))
+
+
+    def pointers(self):
+        for dx, dy in self.inputs:
+            yield None if dx == self.STILL else (dx, dy)
+
+
+    def save(self, path):
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, self.seed, self.map_size[0],
+                                  self.map_size[1], self.minimum_bots, len(self.inputs), 
+                                  self.FLAG_LOD if self.lod else 0, self.final_hash)
+        data = np.array(self.inputs, dtype='<i2').reshape(-1, 2).tobytes()
+        with open(path, 'wb') as f:
+            f.write(header + zlib.compress(data, 9))
+
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            blob = f.read()
+        magic, version = struct.unpack_from('<4sH', blob) if len(blob) >= 6 else (None, None)
+        if magic != cls.MAGIC or version not in (1, cls.VERSION):
+            raise ValueError(f"{path} is not a version 1-{cls.VERSION} MC-R recording")
+        header = cls.HEADER if version == cls.VERSION else cls.HEADER_V1
+        if len(blob) < header.size:
+            raise ValueError(f"{path} is too short to be a recording")
+        if version == cls.VERSION:
+            _, _, seed, width, height, minimum_bots, ticks, flags, final_hash = header.unpack_from(blob)
+        else:
+            _, _, seed, width, height, minimum_bots, ticks, final_hash = header.unpack_from(blob)
+            flags = 0
+        inputs = np.frombuffer(zlib.decompress(blob[header.size:]), dtype='<i2')
+        if len(inputs) != 2 * ticks:
+            raise ValueError(f"{path} holds {len(inputs) // 2} ticks, expected {ticks}")
+        recording = cls(seed, (width, height), minimum_bots, bool(flags & cls.FLAG_LOD))
+        recording.inputs = [tuple(pair) for pair in inputs.reshape(-1, 2).tolist()]
+        recording.final_hash = final_hash
+        return recording
+
+
+
+def write_atomically(path, write):
+    """Call write(f) on a temporary file next to path, then swap it in.
+    
+    A crash halfway through leaves the previous file untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.mcr_save_', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+
+def write_savegame(arrays, path, compress=True):
+    """Write a snapshot as the base save and give it an empty journal (if it has a base_id)"""
+    # A file object keeps numpy from renaming the file
+    write_atomically(path, lambda f: (np.savez_compressed if compress else np.savez)(f, **arrays))
+    start_journal(journal_path(path), int(arrays['base_id']))
+
+
+
+JOURNAL_HEADER = struct.Struct('<4sHq')   # magic, version, base_id of the save it extends
+JOURNAL_RECORD = struct.Struct('<II')     # payload length, crc32 of the payload
+JOURNAL_MAGIC = b'MCRJ'
+JOURNAL_VERSION = 1
+FOOD_COLUMNS = ('food_uid', 'food_x', 'food_y', 'food_nutrition', 'food_size', 
+                'food_points', 'food_point_count')
+CREATURE_COLUMNS = ('creature_xy', 'creature_stats', 'creature_color')
+
+
+
+def journal_path(save_path):
+    return os.path.splitext(save_path)[0] + '.journal'
+
+
+def start_journal(path, base_id):
+    """Replace the journal with an empty one for the base save base_id (0 = no journal)"""
+    if base_id:
+        header = JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, base_id)
+        write_atomically(path, lambda f: f.write(header))
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def append_journal(path, delta):
+    buffer = io.BytesIO()
+    np.savez(buffer, **delta)
+    payload = zlib.compress(buffer.getvalue())
+    with open(path, 'ab') as f:
+        f.write(JOURNAL_RECORD.pack(len(payload), zlib.crc32(payload)) + payload)
+
+
+def read_journal(path, base_id):
+    """The deltas recorded against the base save base_id, oldest first.
+    
+    A journal written for another base is ignored, and reading stops at the first
+    record that is cut short or damaged (e.g. by a crash while appending).
+    """
+    if not base_id or not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        blob = f.read()
+    if len(blob) < JOURNAL_HEADER.size:
+        return []
+    magic, version, journal_base_id = JOURNAL_HEADER.unpack_from(blob)
+    if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION or journal_base_id != base_id:
+        return []
+    
+    deltas = []
+    offset = JOURNAL_HEADER.size
+    while offset + JOURNAL_RECORD.size <= len(blob):
+        length, crc = JOURNAL_RECORD.unpack_from(blob, offset)
+        payload = blob[offset + JOURNAL_RECORD.size:offset + JOURNAL_RECORD.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        offset += JOURNAL_RECORD.size + length
+        with np.load(io.BytesIO(zlib.decompress(payload))) as data:
+            deltas.append({name: data[name] for name in data.files})
+    return deltas
+
+
+
+def save_delta(previous, current):
+    """What changed between two snapshots, for apply_save_delta.
+    
+    Foods are matched by uid and bots by bot_id; eaten foods and removed bots are
+    listed by id, new foods and new or changed bots in full. Obstacles never change.
+    """
+    delta = {'player': current['player'], 'next_bot_id': current['next_bot_id']}
+    
+    old_uid, new_uid = previous['food_uid'], current['food_uid']
+    delta['food_removed_uid'] = np.setdiff1d(old_uid, new_uid, assume_unique=True)
+    added = ~np.isin(new_uid, old_uid, assume_unique=True)
+    for name in FOOD_COLUMNS:
+        delta[name] = current[name][added]
+    
+    old_ids, new_ids = previous['creature_stats'][:, 3], current['creature_stats'][:, 3]
+    delta['creature_removed_id'] = np.setdiff1d(old_ids, new_ids, assume_unique=True)
+    kept = np.isin(new_ids, old_ids, assume_unique=True)
+    order = np.argsort(old_ids)
+    old_rows = order[np.searchsorted(old_ids, new_ids[kept], sorter=order)]
+    changed = ~kept
+    changed[kept] = ((previous['creature_xy'][old_rows] != current['creature_xy'][kept]).any(axis=1) |
+                     (previous['creature_stats'][old_rows] != current['creature_stats'][kept]).any(axis=1))
+    for name in CREATURE_COLUMNS:
+        delta[name] = current[name][changed]
+    
+    new_colors = ~np.isin(current['bot_color_ids'], previous['bot_color_ids'], assume_unique=True)
+    delta['bot_color_ids'] = current['bot_color_ids'][new_colors]
+    delta['bot_colors'] = current['bot_colors'][new_colors]
+    return delta
+
+
+def apply_save_delta(state, delta):
+    """Bring a snapshot up to date with one journal delta, in place"""
+    # New foods have the highest uids, so appending keeps the foods in uid order
+    keep = ~np.isin(state['food_uid'], delta['food_removed_uid'])
+    for name in FOOD_COLUMNS:
+        state[name] = np.concatenate([state[name][keep], delta[name]])
+    
+    # Bots are listed in bot_id order, which is also the order they were spawned in
+    replaced = np.concatenate([delta['creature_removed_id'], delta['creature_stats'][:, 3]])
+    keep = ~np.isin(state['creature_stats'][:, 3], replaced)
+    merged = {name: np.concatenate([state[name][keep], delta[name]]) for name in CREATURE_COLUMNS}
+    order = np.argsort(merged['creature_stats'][:, 3], kind='stable')
+    for name in CREATURE_COLUMNS:
+        state[name] = merged[name][order]
+    
+    state['bot_color_ids'] = np.concatenate([state['bot_color_ids'], delta['bot_color_ids']])
+    state['bot_colors'] = np.concatenate([state['bot_colors'], delta['bot_colors']])
+    state['player'] = delta['player']
+    state['next_bot_id'] = delta['next_bot_id']
+
+
+
+class SaveJournal:
+    """Turns a series of snapshots into one base save followed by journal deltas.
+    
+    Every checkpoint is a delta against the one before, so it costs what changed.
+    Compaction: after max_records deltas, or once they add up to half the size of
+    the base, the next checkpoint writes a fresh base and an empty journal.
+    """
+    def __init__(self, max_records=120):
+        self.max_records = max_records
+        self.previous = None
+        self.records = 0
+        self.delta_bytes = 0
+        self.base_bytes = 0
+
+
+    def checkpoint(self, arrays):
+        """Return ('base', arrays) or ('delta', delta) to hand to an Autosaver"""
+        previous, self.previous = self.previous, arrays
+        if (previous is None or self.records >= self.max_records or 
+                self.delta_bytes > self.base_bytes // 2):
+            # Not from the random module, which has to stay reproducible
+            arrays['base_id'] = np.array(int.from_bytes(os.urandom(7), 'little') + 1)
+            self.records = self.delta_bytes = 0
+            self.base_bytes = sum(array.nbytes for array in arrays.values())
+            return 'base', arrays
+        
+        arrays['base_id'] = previous['base_id']
+        delta = save_delta(previous, arrays)
+        self.records += 1
+        self.delta_bytes += sum(array.nbytes for array in delta.values())
+        return 'delta', delta
+
+
+    def force_base(self):
+        self.previous = None
+
+
+
+class Autosaver:
+    """Writes saves on a background thread so saving never stalls a frame.
+    
+    Full saves (submit) replace whatever has not been started yet; journal deltas
+    (append) are written in order after them. If appending a delta fails, the
+    following ones are dropped until the next full save, and needs_base says so.
+    """
+    def __init__(self, path=SAVE_PATH, compress=True):
+        self.path = path
+        self.compress = compress
+        self.jobs = deque()
+        self.saves = 0
+        self.needs_base = False
+        self.condition = threading.Condition()
+        self.closing = False
+        self.thread = threading.Thread(target=self._work, name='autosave', daemon=True)
+        self.thread.start()
+
+
+    def submit(self, arrays):
+        with self.condition:
+            self.jobs.clear()
+            self.jobs.append(('base', arrays))
+            self.condition.notify()
+
+
+    def append(self, delta):
+        with self.condition:
+            self.jobs.append(('delta', delta))
+            self.condition.notify()
+
+
+    def checkpoint(self, journal, arrays):
+        """Queue a snapshot through a SaveJournal, as a base or as a delta"""
+        if self.needs_base:
+            journal.force_base()
+        kind, arrays = journal.checkpoint(arrays)
+        if kind == 'base':
+            self.submit(arrays)
+        else:
+            self.append(arrays)
+
+
+    def close(self):
+        """Finish all queued writes and stop the thread"""
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join()
+
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not self.jobs and not self.closing:
+                    self.condition.wait()
+                if not self.jobs:
+                    return
+                kind, arrays = self.jobs.popleft()
+            try:
+                if kind == 'base':
+                    write_savegame(arrays, self.path, self.compress)
+                    self.needs_base = False
+                elif not self.needs_base:
+                    append_journal(journal_path(self.path), arrays)
+                self.saves += 1
+            except Exception as e:
+                print(f"Error autosaving game: {e}")
+                self.needs_base = True
+
+
+
+def find_savegame():
+    """Path of the save to load, preferring the binary format, or None"""
+    for path in (SAVE_PATH, LEGACY_SAVE_PATH):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def remove_savegame():
+    """Delete every save file (binary, journal, legacy), e.g. once the player has died"""
+    for path in (SAVE_PATH, journal_path(SAVE_PATH), LEGACY_SAVE_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+
+def cell_key(cell_x, cell_y):
+    return cell_x * (1 << 24) + cell_y
+
+
+def build_cell_index(xs, ys, ids, cell_size):
+    """Sort ids by the grid cell of their point; returns (sorted cell keys, sorted ids)"""
+    keys = cell_key((xs // cell_size).astype(np.int64), (ys // cell_size).astype(np.int64))
+    order = np.argsort(keys, kind='stable')
+    return keys[order], ids[order]
+
+
+def query_cell_index(sorted_keys, sorted_ids, xs, ys, reach, cell_size):
+    """Candidate (query, id) pairs: every indexed id in a cell within reach of each query point"""
+    span = int(reach // cell_size) + 1
+    offsets = np.arange(-span, span + 1)
+    query_cx = (xs // cell_size).astype(np.int64)[:, None, None] + offsets[None, :, None]
+    query_cy = (ys // cell_size).astype(np.int64)[:, None, None] + offsets[None, None, :]
+    query_keys = cell_key(query_cx, query_cy).reshape(len(xs), len(offsets)**2)
+    
+    low = np.searchsorted(sorted_keys, query_keys, 'left').ravel()
+    high = np.searchsorted(sorted_keys, query_keys, 'right').ravel()
+    counts = high - low
+    query_ids = np.repeat(np.repeat(np.arange(len(xs)), query_keys.shape[1]), counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return query_ids, sorted_ids[np.repeat(low, counts) + within]
+
+
+
+def interpolated_position(entity, alpha):
+    """Where to draw an entity a fraction alpha of the way from its last tick to this one"""
+    return (entity.prev_x + (entity.x - entity.prev_x) * alpha,
+            entity.prev_y + (entity.y - entity.prev_y) * alpha)
 
 
 
@@ -931,38 +2893,31 @@ def get_slide_vector(x1, y1, x2, y2, obstacle):
             return 0, math.copysign(1, dy)  # Slide vertically
 
 
-def move_with_sliding(entity, new_x, new_y, obstacles):
+def move_with_sliding(entity, new_x, new_y, obstacle_field):
     """Updated movement handling with proper rectangle collision"""
-    final_x, final_y = new_x, new_y
+    obstacle = obstacle_field.hit(new_x, new_y, entity.radius)
+    if obstacle is None:
+        return new_x, new_y
     
-    for obstacle in obstacles:
-        if check_collision(new_x, new_y, entity.radius, 
-                         obstacle.x, obstacle.y, obstacle.size, 
-                         obstacle.shape):
-            if obstacle.shape == 'circle':
-                # Use existing circular obstacle sliding
-                slide_x, slide_y = get_slide_vector(
-                    entity.x, entity.y, new_x, new_y, obstacle
-                )
-                
-                speed = math.sqrt((new_x - entity.x)**2 + (new_y - entity.y)**2)
-                slide_amount = speed * 0.8
-                final_x = entity.x + slide_x * slide_amount
-                final_y = entity.y + slide_y * slide_amount
-                
-                if check_collision(final_x, final_y, entity.radius,
-                                 obstacle.x, obstacle.y, obstacle.size,
-                                 'circle'):
-                    return entity.x, entity.y
-            else:
-                # Use border-style sliding for rectangles
-                final_x, final_y = handle_rectangle_collision(
-                    entity, new_x, new_y, obstacle
-                )
-            
-            break
+    if obstacle.shape == 'circle':
+        # Use existing circular obstacle sliding
+        slide_x, slide_y = get_slide_vector(
+            entity.x, entity.y, new_x, new_y, obstacle
+        )
+        
+        speed = math.sqrt((new_x - entity.x)**2 + (new_y - entity.y)**2)
+        slide_amount = speed * 0.8
+        final_x = entity.x + slide_x * slide_amount
+        final_y = entity.y + slide_y * slide_amount
+        
+        if check_collision(final_x, final_y, entity.radius,
+                         obstacle.x, obstacle.y, obstacle.size,
+                         'circle'):
+            return entity.x, entity.y
+        return final_x, final_y
     
-    return final_x, final_y
+    # Use border-style sliding for rectangles
+    return handle_rectangle_collision(entity, new_x, new_y, obstacle)
 
 
 
@@ -993,82 +2948,941 @@ def handle_rectangle_collision(entity, new_x, new_y, obstacle):
 
 
 
-def handle_collisions(game):
-    # Bot-Food collisions
-    for creature in game.creatures:
-        for food in game.foods[:]:
-            if check_collision(creature.x, creature.y, creature.radius, 
-                             food.x, food.y, food.size):
-                current_max_nutrition = calculate_required_nutrition(creature.level) / 1.5
-                if food.nutrition <= current_max_nutrition:
-                    creature.nutrition += food.nutrition
-                    creature.hp = min(100, creature.hp + food.nutrition * 2)
-                    game.foods.remove(food)
-                    creature.target_food = None  # Reset target after eating
-                    
-                    # Check for level up
-                    required_nutrition = calculate_required_nutrition(creature.level)
-                    if creature.nutrition >= required_nutrition:
-                        creature.level += 1
-                        creature.nutrition = 0
-                        creature.radius = creature.base_radius + creature.level
-
-    # Player-Food collisions
-    for food in game.foods[:]:
-        if check_collision(game.player.x, game.player.y, game.player.radius, 
-                         food.x, food.y, food.size):
-            current_max_nutrition = calculate_required_nutrition(game.player.level) / 1.5
-            if food.nutrition <= current_max_nutrition:
-                game.player.nutrition += food.nutrition
-                game.player.hp = min(100, game.player.hp + food.nutrition * 2)
-                game.foods.remove(food)
+class MovingBot:
+    """Stand-in bot with just what move_with_sliding reads"""
+    __slots__ = ('x', 'y', 'radius')
+
+
+def move_bots(bots, movers, target_x, target_y, map_size, obstacle_field):
+    """Step the bots in movers towards their targets chosen by plan_bot_moves.
+    
+    Works on the BotArrays rows alone and no bot's step depends on another's, so
+    disjoint slices of movers can be moved side by side (see BotPlannerPool.move);
+    Game.apply_bot_moves hands the new positions on to the creatures.
+    """
+    bot = MovingBot()
+    new_x, new_y = [], []
+    for x, y, radius, goal_x, goal_y in zip(bots.x[movers].tolist(), bots.y[movers].tolist(),
+                                            bots.radius[movers].tolist(),
+                                            target_x[movers].tolist(), target_y[movers].tolist()):
+        # Use exactly the same movement and collision handling as player
+        bot.x, bot.y, bot.radius = x, y, radius
+        x, y = move_with_sliding(bot, goal_x, goal_y, obstacle_field)
+        
+        # Apply border constraints
+        new_x.append(max(radius, min(map_size[0] - radius, x)))
+        new_y.append(max(radius, min(map_size[1] - radius, y)))
+    bots.x[movers] = new_x
+    bots.y[movers] = new_y
+
+
+def plan_bot_moves(bots, player, foods, active=None, steps=None, pool=None):
+    """Pick this tick's target for every active bot at once: flee, hunt, eat or wander.
+    Returns target x and y, a mask of the bots that move and their food handles (-1 for none)"""
+    count = len(bots)
+    # With a pool these live in its shared memory, where the workers write them
+    scratch = pool.scratch if pool else lambda name, size, dtype: np.empty(size, dtype)
+    target_x = scratch('target_x', count, float)
+    target_y = scratch('target_y', count, float)
+    moving = scratch('moving', count, bool)
+    target_food = scratch('target_food', count, np.int64)
+    decided = scratch('decided', count, bool)   # bots sitting this tick out count as decided
+    target_x.fill(0)
+    target_y.fill(0)
+    moving.fill(False)
+    target_food.fill(-1)
+    decided.fill(True)
+    if count == 0:
+        return target_x, target_y, moving, target_food
+    
+    # The player is the last point, matching the old threat list order
+    pos_x, pos_y, level = bots.with_player(player)
+    speed = scratch('speed', count, float)
+    np.multiply(bots.speed, 1 if steps is None else steps, out=speed)
+    actors = np.arange(count) if active is None else np.flatnonzero(active)
+    plan = (target_x, target_y, moving, target_food, decided)
+    
+    # Creature pairs close enough to matter for fleeing or hunting are found in this index
+    creature_index = build_cell_index(pos_x, pos_y, np.arange(count + 1), Creature.HUNT_RANGE)
+    if pool is None:
+        decide_bot_moves(pos_x, pos_y, level, speed, foods, actors, creature_index, plan)
+    else:
+        pool.decide(bots, speed, foods, actors, creature_index, plan)
+    
+    # Random movement if no target (drawn here, in bot order, so a pool changes nothing)
+    for i in np.flatnonzero(~decided).tolist():
+        angle = random.uniform(0, 2 * math.pi)
+        target_x[i] = pos_x[i] + math.cos(angle) * speed[i]
+        target_y[i] = pos_y[i] + math.sin(angle) * speed[i]
+        moving[i] = True
+    
+    return target_x, target_y, moving, target_food
+
+
+def decide_bot_moves(pos_x, pos_y, level, speed, foods, actors, creature_index, plan):
+    """The fleeing, hunting and food rules of plan_bot_moves for the bots in actors.
+    
+    Writes only the actors' entries of the plan arrays (target x, target y, moving,
+    target food, decided), so disjoint slices of actors can be decided side by side.
+    Actors left undecided are the ones that wander.
+    """
+    target_x, target_y, moving, target_food, decided = plan
+    count = len(speed)
+    decided[actors] = False
+    
+    def head_for(bots, x, y, away=False):
+        dx = x - pos_x[bots]
+        dy = y - pos_y[bots]
+        if away:
+            dx, dy = -dx, -dy
+        dist = np.sqrt(dx*dx + dy*dy)
+        decided[bots] = True
+        go = dist > 0   # already on the target: stand still this tick
+        bots, dx, dy, dist = bots[go], dx[go], dy[go], dist[go]
+        target_x[bots] = pos_x[bots] + dx / dist * speed[bots]
+        target_y[bots] = pos_y[bots] + dy / dist * speed[bots]
+        moving[bots] = True
+    
+    def first_per_bot(bots, *sort_keys):
+        """Indices of the first entry per bot after sorting by the keys (most significant last)"""
+        order = np.lexsort(sort_keys + (bots,))
+        return order[np.unique(bots[order], return_index=True)[1]]
+    
+    keys, ids = creature_index
+    bot, other = query_cell_index(keys, ids, pos_x[actors], pos_y[actors],
+                                  Creature.HUNT_RANGE, Creature.HUNT_RANGE)
+    bot = actors[bot]
+    dx = pos_x[other] - pos_x[bot]
+    dy = pos_y[other] - pos_y[bot]
+    dist = np.sqrt(dx*dx + dy*dy)
+    
+    # Flee from the first threat in list order; a threat exactly on top is skipped
+    flee = (level[other] > level[bot]) & (dist < Creature.FLEE_DISTANCE) & (dist > 0)
+    first = first_per_bot(bot[flee], other[flee])
+    fleeing, threat = bot[flee][first], other[flee][first]
+    head_for(fleeing, pos_x[threat], pos_y[threat], away=True)
+    
+    # Hunt the nearest prey in range; on a tie the player wins, then list order
+    hunt = (level[other] < level[bot]) & (dist < Creature.HUNT_RANGE) & ~decided[bot]
+    tie_rank = np.where(other == count, -1, other)
+    first = first_per_bot(bot[hunt], tie_rank[hunt], dist[hunt])
+    hunters, prey = bot[hunt][first], other[hunt][first]
+    head_for(hunters, pos_x[prey], pos_y[prey])
+    
+    # Nearest edible food, searched in nearby cells first
+    hungry = actors[~decided[actors]]
+    caps = {lvl: calculate_required_nutrition(lvl) / 1.5 for lvl in set(level[hungry].tolist())}
+    max_nutrition = np.zeros(count)
+    max_nutrition[hungry] = [caps[lvl] for lvl in level[hungry].tolist()]
+    search = Creature.HUNT_RANGE
+    query, slots = foods.near_pairs(pos_x[hungry], pos_y[hungry], search)
+    bot = hungry[query]
+    dist_sq = (foods.x[slots] - pos_x[bot])**2 + (foods.y[slots] - pos_y[bot])**2
+    edible = (foods.nutrition[slots] <= max_nutrition[bot]) & (dist_sq <= search * search)
+    first = first_per_bot(bot[edible], slots[edible], dist_sq[edible])
+    feeders, food = bot[edible][first], slots[edible][first]
+    head_for(feeders, foods.x[food], foods.y[food])
+    target_food[feeders] = foods.handles(food)
+    
+    # Bots with nothing nearby fall back to a brute-force search over all edible foods
+    hungry = actors[~decided[actors]]
+    live = foods.live_slots()
+    for cap in np.unique(max_nutrition[hungry]).tolist():
+        group = hungry[max_nutrition[hungry] == cap]
+        edible = live[foods.nutrition[live] <= cap]
+        if len(edible) == 0:
+            continue
+        food_x, food_y = foods.x[edible], foods.y[edible]
+        rows = max(1, 2000000 // len(edible))   # bound the distance matrix size
+        for start in range(0, len(group), rows):
+            bots = group[start:start + rows]
+            dist_sq = ((food_x[None, :] - pos_x[bots, None])**2 +
+                       (food_y[None, :] - pos_y[bots, None])**2)
+            food = edible[np.argmin(dist_sq, axis=1)]
+            head_for(bots, foods.x[food], foods.y[food])
+            target_food[bots] = foods.handles(food)
+
+
+
+class SharedArrays:
+    """Named NumPy arrays in shared memory blocks, for handing state to worker processes"""
+    def __init__(self):
+        self.blocks = {}      # name -> SharedMemory
+        self.addresses = {}   # name -> where its block is mapped in this process
+        self.layout = {}      # name -> (block name, shape, dtype)
+        self.retired = []     # replaced blocks that some view still points into
+
+
+    def array(self, name, shape, dtype):
+        """The shared array called name, with the given shape and undefined contents"""
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        block = self.blocks.get(name)
+        if block is None or block.size < size:
+            if block is not None:
+                block.unlink()
+                self.retired.append(block)
+                self.release()
+            from multiprocessing import shared_memory   # only needed with --ai-workers
+            block = shared_memory.SharedMemory(create=True, size=max(4096, 2 * size))
+            self.blocks[name] = block
+            self.addresses[name] = np.frombuffer(block.buf, np.uint8, 1).ctypes.data
+        self.layout[name] = (block.name, tuple(shape), dtype.str)
+        return np.ndarray(shape, dtype, buffer=block.buf)
+
+
+    def holds(self, name, values):
+        """Whether values (or the start of it) already is the array called name"""
+        block = self.blocks.get(name)
+        return (block is not None and values.flags.c_contiguous and 
+                values.ctypes.data == self.addresses[name] and values.nbytes <= block.size)
+
+
+    def put(self, name, values):
+        values = np.asarray(values)
+        if self.holds(name, values):   # adopted, or written in place: only describe it
+            self.layout[name] = (self.blocks[name].name, values.shape, values.dtype.str)
+        else:
+            self.array(name, values.shape, values.dtype)[...] = values
+
+
+    def adopt(self, name, values):
+        """values copied into the block called name, for the owner to use from now on"""
+        if self.holds(name, values):
+            self.put(name, values)
+            return values
+        shared = self.array(name, values.shape, values.dtype)
+        shared[...] = values
+        return shared
+
+
+    def release(self):
+        """Close the retired blocks no view points into any more"""
+        still_used = []
+        for block in self.retired:
+            try:
+                block.close()
+            except BufferError:
+                still_used.append(block)
+        self.retired = still_used
+
+
+    def close(self):
+        for block in self.blocks.values():
+            block.unlink()
+        self.retired += self.blocks.values()
+        self.release()
+        self.blocks.clear()
+        self.addresses.clear()
+        self.layout.clear()
+
+
+
+attached_blocks = {}   # in a worker process: block name -> SharedMemory
+attached_fields = {}   # in a worker process: field version -> ObstacleField over shared arrays
+
+
+def attach_arrays(layout):
+    """Views of the arrays a SharedArrays layout describes, attaching new blocks as needed"""
+    names = {block_name for block_name, _, _ in layout.values()}
+    for block_name in list(attached_blocks):
+        if block_name not in names:   # reallocated by the main process
+            try:
+                attached_blocks[block_name].close()
+            except BufferError:   # a cached view still uses it; try again next time
+                continue
+            del attached_blocks[block_name]
+    from multiprocessing import shared_memory   # only needed with --ai-workers
+    arrays = {}
+    for name, (block_name, shape, dtype) in layout.items():
+        block = attached_blocks.get(block_name)
+        if block is None:
+            # Registers the block with the main process's resource tracker again,
+            # which is harmless: it keeps one entry per block (see BotPlannerPool.__init__)
+            block = shared_memory.SharedMemory(block_name)
+            attached_blocks[block_name] = block
+        arrays[name] = np.ndarray(shape, dtype, buffer=block.buf)
+    return arrays
+
+
+def decide_in_worker(task):
+    """BotPlannerPool's job for one worker: decide_bot_moves for a slice of the actors"""
+    layout, info, start, stop = task
+    arrays = attach_arrays(layout)
+    bots = BotArrays.from_shared(arrays, info['bots'])
+    foods = FoodStore.from_shared(arrays, info['foods'])
+    pos_x, pos_y, level = bots.with_player()
+    plan = tuple(arrays[name] for name in BotPlannerPool.PLAN)
+    decide_bot_moves(pos_x, pos_y, level, arrays['speed'], foods, arrays['actors'][start:stop],
+                     (arrays['creature_keys'], arrays['creature_ids']), plan)
+
+
+def move_in_worker(task):
+    """BotPlannerPool's job for one worker: move_bots for a slice of the movers"""
+    layout, info, start, stop = task
+    arrays = attach_arrays(layout)
+    field_info = info['field']
+    field = attached_fields.get(field_info['version'])
+    if field is None:
+        attached_fields.clear()
+        field = ObstacleField.from_shared(arrays, field_info)
+        attached_fields[field_info['version']] = field
+    move_bots(BotArrays.from_shared(arrays, info['bots']), arrays['movers'][start:stop],
+              arrays['target_x'], arrays['target_y'], info['map_size'], field)
+
+
+
+class BotPlannerPool:
+    """Worker processes that split the bot decisions and moves of a tick between them"""
+    PLAN = ('target_x', 'target_y', 'moving', 'target_food', 'decided')
+    
+    def __init__(self, workers):
+        import multiprocessing   # only needed with --ai-workers
+        from multiprocessing import resource_tracker
+        self.workers = workers
+        self.shared = SharedArrays()
+        if os.name == 'posix':
+            # Workers inherit a running tracker instead of starting their own, which
+            # would unlink the blocks they attached to when they exit
+            resource_tracker.ensure_running()
+        self.pool = multiprocessing.Pool(workers)
+        self.residents = {}   # 'bots', 'foods' or 'field' -> the object shared under it
+        self.field_info = None
+        self.field_version = 0
+
+
+    def scratch(self, name, count, dtype):
+        """An array for this tick's inputs or results that workers can see as it is"""
+        return self.shared.array(name, (count,), dtype)
+
+
+    def resident(self, key, owner):
+        """Move owner's arrays into shared memory (once) and return what workers need"""
+        old = self.residents.get(key)
+        if old is not None and old is not owner:
+            old.unshare()   # its blocks are about to be reused
+        self.residents[key] = owner
+        return owner.share(self.shared)
+
+
+    def run(self, job, info, count):
+        """job over range(count), in one slice per worker"""
+        bounds = np.linspace(0, count, self.workers + 1).astype(int).tolist()
+        self.pool.map(job, [(self.shared.layout, info, start, stop)
+                            for start, stop in zip(bounds, bounds[1:]) if stop > start])
+
+
+    def decide(self, bots, speed, foods, actors, creature_index, plan):
+        """decide_bot_moves over all actors, spread across the workers"""
+        info = {'bots': self.resident('bots', bots), 'foods': self.resident('foods', foods)}
+        for name, array in (('speed', speed), ('actors', actors),
+                            ('creature_keys', creature_index[0]),
+                            ('creature_ids', creature_index[1])) + tuple(zip(self.PLAN, plan)):
+            self.shared.put(name, array)
+        self.run(decide_in_worker, info, len(actors))
+
+
+    def move(self, bots, movers, target_x, target_y, map_size, obstacle_field):
+        """move_bots over all movers, spread across the workers"""
+        if self.residents.get('field') is not obstacle_field:
+            self.field_version += 1
+            self.field_info = self.resident('field', obstacle_field)
+            self.field_info['version'] = self.field_version
+        info = {'bots': self.resident('bots', bots), 'field': self.field_info,
+                'map_size': map_size}
+        for name, array in (('movers', movers), ('target_x', target_x), ('target_y', target_y)):
+            self.shared.put(name, array)
+        self.run(move_in_worker, info, len(movers))
+
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        for owner in self.residents.values():
+            owner.unshare()
+        self.residents.clear()
+        self.shared.close()
+
+
+
+def handle_collisions(game, active=None):
+    """Eating and fighting for one tick; returns True when the player got eaten.
+    
+    With an active mask (see SimulationLOD) only those bots eat this tick, and fights
+    are only checked where at least one of the two bots is active. Inactive bots are
+    never visited: their positions come from game.bots and game.creature_grid.
+    """
+    player = game.player
+    foods = game.foods
+    creatures = game.creatures
+    bots = game.bots
+    actors = np.arange(len(creatures)) if active is None else np.flatnonzero(active)
+    
+    # Bot-Food and Player-Food collisions as one batched distance test.
+    # Bots come first and the player last, like the old per-entity loops.
+    eaters = [creatures[i] for i in actors.tolist()] + [player]
+    eater_x = np.append(bots.x[actors], player.x)
+    eater_y = np.append(bots.y[actors], player.y)
+    eater_r = np.array([e.radius for e in eaters], dtype=float)
+    
+    eater_ids, slots = foods.near_pairs(eater_x, eater_y, eater_r.max() + foods.max_size)
+    dx = foods.x[slots] - eater_x[eater_ids]
+    dy = foods.y[slots] - eater_y[eater_ids]
+    hit = dx*dx + dy*dy < (eater_r[eater_ids] + foods.size[slots])**2
+    eater_ids = eater_ids[hit]
+    slots = slots[hit]
+    order = np.argsort(eater_ids, kind='stable')
+    
+    # Resolve hits in order: a food goes to the first eater that can eat it
+    for e, slot in zip(eater_ids[order].tolist(), slots[order].tolist()):
+        if not foods.alive[slot]:
+            continue
+        eater = eaters[e]
+        nutrition = int(foods.nutrition[slot])
+        current_max_nutrition = calculate_required_nutrition(eater.level) / 1.5
+        if nutrition <= current_max_nutrition:
+            eater.nutrition += nutrition
+            eater.hp = min(100, eater.hp + nutrition * 2)
+            foods.remove(slot)
+            if eater is player:
                 game.food_eaten_count += 1
-                
-                # Check for player level up
-                required_nutrition = calculate_required_nutrition(game.player.level)
-                if game.player.nutrition >= required_nutrition:
-                    game.player.level += 1
-                    game.player.nutrition = 0
-                    game.player.radius = game.player.base_radius + game.player.level
+            else:
+                eater.target_food = None  # Reset target after eating
+                bots.target_food[actors[e]] = -1
+            
+            # Check for level up
+            required_nutrition = calculate_required_nutrition(eater.level)
+            if eater.nutrition >= required_nutrition:
+                eater.level += 1
+                eater.nutrition = 0
+                eater.radius = eater.base_radius + eater.level
+                if eater is not player:
+                    bots.level[actors[e]] = eater.level
+                    bots.radius[actors[e]] = eater.radius
+                    game.creature_grid.grow(eater.radius)
+            game.leaderboard.update(eater)
+    
+    foods.flush_removals()
+    
+    # The grid follows the bots as they move (see Game.apply_bot_moves)
+    creature_grid = game.creature_grid
+    removed_creatures = set()
                 
     # Player-Creature collisions
-    for creature in game.creatures[:]:
-        if check_collision(game.player.x, game.player.y, game.player.radius,
+    for creature in creature_grid.query(player.x, player.y, player.radius):
+        if check_collision(player.x, player.y, player.radius,
                          creature.x, creature.y, creature.radius):
-            if game.player.level > creature.level:
+            if player.level > creature.level:
                 creature.hp -= 20
                 if creature.hp <= 0:
-                    game.player.nutrition += calculate_required_nutrition(creature.level)
-                    game.creatures.remove(creature)
-            elif game.player.level < creature.level:
-                game.player.hp -= 20
-                if game.player.hp <= 0:
-                    game.show_game_over_screen(creature.level)
+                    player.nutrition += calculate_required_nutrition(creature.level)
+                    removed_creatures.add(creature)
+                    game.leaderboard.update(player)
+            elif player.level < creature.level:
+                player.hp -= 20
+                if player.hp <= 0:
+                    game.killer_level = creature.level
                     return True
                 
-    # Creature-Creature collisions
-    for i, creature1 in enumerate(game.creatures):
-        for creature2 in game.creatures[i+1:]:
+    # Creature-Creature collisions (each neighbouring pair is tested once, in list order;
+    # a pair with an inactive bot is tested from the active side)
+    active_bots = None if active is None else set(eaters)
+    for creature1 in eaters[:-1]:
+        if creature1 in removed_creatures:
+            continue
+        for creature2 in creature_grid.query(creature1.x, creature1.y, creature1.radius):
+            if ((creature2.bot_id <= creature1.bot_id and 
+                    (active_bots is None or creature2 in active_bots)) or
+                    creature2 in removed_creatures):
+                continue
             if check_collision(creature1.x, creature1.y, creature1.radius,
                              creature2.x, creature2.y, creature2.radius):
                 if creature1.level > creature2.level:
                     creature2.hp -= 20
                     if creature2.hp <= 0:
                         creature1.nutrition += calculate_required_nutrition(creature2.level)
-                        game.creatures.remove(creature2)
+                        removed_creatures.add(creature2)
+                        game.leaderboard.update(creature1)
                 elif creature1.level < creature2.level:
                     creature1.hp -= 20
                     if creature1.hp <= 0:
                         creature2.nutrition += calculate_required_nutrition(creature1.level)
-                        game.creatures.remove(creature1)
+                        removed_creatures.add(creature1)
+                        game.leaderboard.update(creature2)
                         break
     
+    if removed_creatures:
+        gone = np.sort(bots.find(removed_creatures))
+        for i in gone[::-1].tolist():
+            del creatures[i]
+        bots.delete(gone)
+        for creature in removed_creatures:
+            creature_grid.remove(creature)
+            game.leaderboard.remove(creature)
+        game.creature_pool.extend(removed_creatures)
+    
     return False
 
 
 
+def run_headless(ticks, world_size=None, minimum_bots=35, recorder=None, lod=False, ai_workers=0,
+                 load=False):
+    """Simulate without a display, as fast as possible, and print a short summary.
+    
+    The player stands still and is respawned whenever it gets eaten.
+    With a recorder every tick counts as one frame. load=True starts from the saved
+    game (a new world if there is none).
+    """
+    game = Game(headless=True, world_size=world_size, minimum_bots=minimum_bots,
+                recorder=recorder, lod=lod, ai_workers=ai_workers, load=load)
+    profiler = game.profiler
+    deaths = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        profiler.begin_frame()
+        if game.step(None):
+            deaths += 1
+            game.respawn_player()
+            profiler.mark('respawn')
+        if recorder:
+            recorder.record(game, profiler.end_frame())
+    elapsed = time.perf_counter() - start
+    if recorder:
+        recorder.dump_recent()
+    game.close()
+    
+    print(f"{ticks} ticks in {elapsed:.2f}s ({ticks / elapsed:.0f} ticks/s), "
+          f"map {game.map_size[0]}x{game.map_size[1]}, {len(game.creatures)} bots, "
+          f"{len(game.foods)} foods, {len(game.obstacles)} obstacles, player eaten {deaths}x")
+
+
+
+def run_replay(path, output=None):
+    """Re-run a recorded session headless, as fast as possible, timing every tick.
+    
+    Returns True when the world ends up exactly where the recording did.
+    """
+    recording = InputRecording.load(path)
+    random.seed(recording.seed)
+    game = Game(headless=True, world_size=recording.map_size, 
+                minimum_bots=recording.minimum_bots, lod=recording.lod)
+    tick_ms = np.zeros(len(recording.inputs))
+    clock = time.perf_counter
+    ticks = 0
+    for pointer in recording.pointers():
+        start = clock()
+        game_over = game.step(pointer)
+        tick_ms[ticks] = (clock() - start) * 1000
+        ticks += 1
+        if game_over:
+            break
+    tick_ms = tick_ms[:ticks]
+    
+    matches = ticks == len(recording.inputs) and game.state_hash() == recording.final_hash
+    summary = latency_summary(tick_ms) if ticks else {}
+    print(f"replayed {ticks}/{len(recording.inputs)} ticks in {tick_ms.sum() / 1000:.2f}s, "
+          f"tick ms p50 {summary.get('p50', 0)} p99 {summary.get('p99', 0)} "
+          f"max {summary.get('max', 0)}, final state {'matches' if matches else 'DIFFERS'}",
+          file=sys.stderr)
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'recording': path, 'seed': recording.seed, 'ticks': ticks,
+                       'final_state_matches': matches, 'tick_ms_summary': summary,
+                       'tick_ms': [round(ms, 4) for ms in tick_ms.tolist()]}, f)
+    return matches
+
+
+
+# FrameProfiler phases of Game.step() and Game.draw(), in the order they run
+BENCHMARK_PHASES = ['bot top-up', 'spawn food', 'player move', 'collisions', 'respawn', 'bot AI',
+                    'bot moves', 'draw tiles', 'draw foods', 'draw bots', 'draw player', 'radar',
+                    'leaderboard']
+
+
+
+def build_world(seed, bots, foods, obstacles, ai_workers=0, timed=None):
+    """A headless world generated from seed, the same one on every call.
+    
+    timed(name, function, *args) runs each generation step, e.g. to time it.
+    """
+    if timed is None:
+        timed = lambda name, function, *args: function(*args)
+    random.seed(seed)
+    game = Game(headless=True, minimum_bots=bots, generate=False, ai_workers=ai_workers)
+    timed('generate_obstacles', game.generate_obstacles, obstacles)
+    game.place_player()
+    timed('generate_foods', game.generate_foods, foods)
+    timed('generate_creatures', game.generate_creatures, bots)
+    return game
+
+
+
+def steering(seed):
+    """Player input for benchmark ticks: a new random direction every 120 ticks"""
+    rng = random.Random(seed)   # kept off the world's RNG
+    while True:
+        angle = rng.uniform(0, 2 * math.pi)
+        pointer = (math.cos(angle) * 200, math.sin(angle) * 200)
+        for _ in range(120):
+            yield pointer
+
+
+
+def write_report(report, output):
+    """Write a benchmark report as JSON to output (a path), or print it"""
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        print(json.dumps(report, indent=1))
+
+
+
+def benchmark_world(bots, foods, obstacles, ticks, seed, screen):
+    """Build one seeded world, then simulate and draw ticks frames, timing every phase"""
+    clock = time.perf_counter
+    setup = {}
+    
+    def timed(name, function, *args):
+        start = clock()
+        result = function(*args)
+        setup[name] = (clock() - start) * 1000
+        return result
+    
+    game = build_world(seed, bots, foods, obstacles, timed=timed)
+    game.screen = screen
+    timed('setup_rendering', game.setup_rendering)
+    
+    # The game's own step() and draw(), timed by the phases their profiler marks
+    profiler = game.profiler
+    profiler.set_recording(True)
+    samples = {name: np.zeros(ticks) for name in BENCHMARK_PHASES}
+    for tick, pointer in zip(range(ticks), steering(seed)):
+        profiler.begin_frame()
+        if game.step(pointer):
+            game.respawn_player()
+            profiler.mark('respawn')
+        game.update_camera()
+        game.draw()
+        for name, seconds in profiler.end_frame().items():
+            samples.setdefault(name, np.zeros(ticks))[tick] = seconds * 1000
+    
+    samples['total'] = sum(samples.values())
+    return {
+        'bots': bots, 'foods': foods, 'obstacles': obstacles,
+        'map_size': list(game.map_size),
+        'setup_ms': {name: round(ms, 3) for name, ms in setup.items()},
+        'tick_ms': {name: latency_summary(values) for name, values in samples.items()},
+        'final': {'bots': len(game.creatures), 'foods': len(game.foods), 
+                  'obstacles': len(game.obstacles)},
+    }
+
+
+
+def latency_summary(values_ms):
+    p50, p90, p99 = np.percentile(values_ms, [50, 90, 99]).tolist()
+    return {'mean': round(float(np.mean(values_ms)), 4), 'p50': round(p50, 4), 
+            'p90': round(p90, 4), 'p99': round(p99, 4), 'max': round(float(np.max(values_ms)), 4)}
+
+
+
+def run_benchmark(bot_counts, food_counts, obstacle_counts, ticks=300, seed=1, output=None):
+    """Sweep bots, foods and obstacles one at a time around the default world.
+    
+    Every world is built from the same seed, so two commits can be compared run by run.
+    Results are written as JSON to output (a path) or printed.
+    """
+    import platform   # only needed for the report
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')   # draw off-screen, no window
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((1920, 1080))
+    
+    baseline = (35, 200, 50)
+    sweeps = ([(b, baseline[1], baseline[2]) for b in bot_counts] +
+              [(baseline[0], f, baseline[2]) for f in food_counts] +
+              [(baseline[0], baseline[1], o) for o in obstacle_counts])
+    runs = []
+    for bots, foods, obstacles in dict.fromkeys(sweeps):
+        print(f"benchmark: {bots} bots, {foods} foods, {obstacles} obstacles", file=sys.stderr)
+        runs.append(benchmark_world(bots, foods, obstacles, ticks, seed, screen))
+    
+    report = {
+        'seed': seed, 'ticks': ticks,
+        'versions': {'python': platform.python_version(), 'numpy': np.__version__,
+                     'pygame': pygame.version.ver, 'platform': platform.platform()},
+        'runs': runs,
+    }
+    write_report(report, output)
+
+
+
+SAVE_FORMATS = {
+    'json': (lambda game, path: game.save_json(path), Game.load_json),
+    'npz': (lambda game, path: game.save_game(path, compress=False), Game.load_binary),
+    'npz_compressed': (lambda game, path: game.save_game(path, compress=True), Game.load_binary),
+}
+
+
+
+def run_save_benchmark(bot_counts, food_counts, seed=1, repeats=3, output=None):
+    """Time saving and loading seeded worlds in every save format and compare file sizes.
+    
+    Bots and foods are swept one at a time around the default world, as in run_benchmark;
+    times are the best of repeats runs.
+    """
+    clock = time.perf_counter
+    sweeps = [(b, 200) for b in bot_counts] + [(35, f) for f in food_counts]
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+        for bots, foods in dict.fromkeys(sweeps):
+            print(f"save benchmark: {bots} bots, {foods} foods", file=sys.stderr)
+            game = build_world(seed, bots, foods, 50)
+            
+            formats = {}
+            for name, (save, load) in SAVE_FORMATS.items():
+                path = os.path.join(directory, 'save.' + name)
+                save_ms, load_ms = [], []
+                for _ in range(repeats):
+                    start = clock()
+                    save(game, path)
+                    save_ms.append((clock() - start) * 1000)
+                    loaded = Game(headless=True, generate=False)
+                    start = clock()
+                    if not load(loaded, path):
+                        raise RuntimeError(f"{name} save could not be loaded")
+                    load_ms.append((clock() - start) * 1000)
+                formats[name] = {'save_ms': round(min(save_ms), 3), 'load_ms': round(min(load_ms), 3),
+                                 'bytes': os.path.getsize(path)}
+            runs.append({'bots': len(game.creatures), 'foods': len(game.foods), 
+                         'obstacles': len(game.obstacles), 'formats': formats})
+    
+    write_report({'seed': seed, 'repeats': repeats, 'runs': runs}, output)
+
+
+
+def run_memory_benchmark(bots=500, foods=10000, ticks=300, seed=1, output=None):
+    """Report memory per entity (tracemalloc) and garbage collector churn while playing.
+    
+    Churn is the number of collections run over ticks simulated and drawn ticks of a
+    seeded world, with the player steered by steering().
+    """
+    import tracemalloc   # only needed for this report
+    def bytes_each(make, count=10000):
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        made = [make() for _ in range(count)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+        del made
+        return round(size / count, 1)
+    
+    random.seed(seed)
+    per_entity = {
+        'creature': bytes_each(lambda: Creature(100.0, 100.0, 1, 1, (90, 90, 90))),
+        'obstacle': bytes_each(lambda: Obstacle(100, 100, 50, 'circle')),
+        'player': bytes_each(lambda: Player(100.0, 100.0)),
+    }
+    store = FoodStore()
+    per_entity['food'] = round(sum(getattr(store, name).nbytes for name in 
+                                   ('x', 'y', 'nutrition', 'size', 'alive', 'points', 
+                                    'point_count', 'uid', 'generation', 'indexed')) / len(store.x), 1)
+    
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.font.init()
+    game = build_world(seed, bots, foods, 50)
+    game.screen = pygame.display.set_mode((1920, 1080))
+    game.setup_rendering()
+    
+    gc.collect()
+    collections = [stats['collections'] for stats in gc.get_stats()]
+    start = time.perf_counter()
+    for tick, pointer in zip(range(ticks), steering(seed)):
+        if game.step(pointer):
+            game.respawn_player()
+        game.update_camera()
+        game.draw()
+    elapsed = time.perf_counter() - start
+    churn = [stats['collections'] - before for stats, before in zip(gc.get_stats(), collections)]
+    
+    report = {
+        'seed': seed, 'bots': bots, 'foods': foods, 'ticks': ticks,
+        'bytes_per_entity': per_entity,
+        'gc_collections': {f'gen{generation}': count for generation, count in enumerate(churn)},
+        'ms_per_tick': round(elapsed / ticks * 1000, 3),
+    }
+    write_report(report, output)
+
+
+
+def run_ai_benchmark(bot_counts, worker_counts, ticks=120, seed=1, output=None):
+    """Time the bot AI and moves over seeded headless worlds with every BotPlannerPool size
+    (0 = none).
+    
+    Worlds and player steering repeat exactly, so each run also checks that it ended
+    in the same state as the first one with the same bot count.
+    """
+    runs = []
+    for bots in bot_counts:
+        first_hash = None
+        for workers in worker_counts:
+            print(f"AI benchmark: {bots} bots, {workers} workers", file=sys.stderr)
+            game = build_world(seed, bots, 200, 50, ai_workers=workers)
+            game.profiler.set_recording(True)
+            ai_ms, move_ms = [], []
+            start = time.perf_counter()
+            for tick, pointer in zip(range(ticks), steering(seed)):
+                game.profiler.begin_frame()
+                if game.step(pointer):
+                    game.respawn_player()
+                frame = game.profiler.end_frame()
+                ai_ms.append(frame.get('bot AI', 0.0) * 1000)
+                move_ms.append(frame.get('bot moves', 0.0) * 1000)
+            elapsed = time.perf_counter() - start
+            game.close()
+            
+            state = game.state_hash().hex()
+            first_hash = first_hash or state
+            runs.append({'bots': bots, 'workers': workers,
+                         'ticks_per_s': round(ticks / elapsed, 1),
+                         'bot_ai_ms': latency_summary(ai_ms),
+                         'bot_moves_ms': latency_summary(move_ms),
+                         'matches_first_run': state == first_hash})
+    
+    write_report({'seed': seed, 'ticks': ticks, 'cpus': os.cpu_count(), 'runs': runs}, output)
+
+
+
+def parse_counts(text):
+    return [int(count) for count in text.split(',')]
+
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MopeClassic-Remake/Revival/Reloaded/Return")
+    parser.add_argument('--headless', action='store_true',
+                        help="simulate without a display and print a summary")
+    parser.add_argument('--ticks', type=int,
+                        help="ticks to simulate (default: 3600 headless, 300 per benchmark world, "
+                             "120 per AI benchmark run)")
+    parser.add_argument('--world-size', type=parse_size, metavar='WxH',
+                        help="map size in pixels (default: 6x the screen)")
+    parser.add_argument('--bots', type=int, default=35,
+                        help="minimum number of bots (default: 35)")
+    parser.add_argument('--tick-rate', type=int, default=60,
+                        help="simulation ticks per second (default: 60)")
+    parser.add_argument('--fps', type=int, default=60,
+                        help="frame rate cap for drawing, 0 for uncapped (default: 60)")
+    parser.add_argument('--seed', type=int, help="seed for the random number generator")
+    parser.add_argument('--lod', action='store_true',
+                        help="update bots far from the player less often (for big maps)")
+    parser.add_argument('--ai-workers', type=int, default=0, metavar='N',
+                        help="decide and move bots in N worker processes (default: 0, in the game loop)")
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument('--load', action='store_true', default=None,
+                       help="load the saved game without asking")
+    start.add_argument('--new', dest='load', action='store_false',
+                       help="start a new world without asking")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="time every engine phase over seeded worlds and report JSON")
+    parser.add_argument('--bench-bots', type=parse_counts, default=[20, 35, 100, 500, 2000],
+                        metavar='N,N,...', help="bot counts to sweep")
+    parser.add_argument('--bench-foods', type=parse_counts, default=[200, 1000, 10000, 100000],
+                        metavar='N,N,...', help="food counts to sweep")
+    parser.add_argument('--bench-obstacles', type=parse_counts, default=[50, 200, 1000],
+                        metavar='N,N,...', help="obstacle counts to sweep")
+    parser.add_argument('--ai-benchmark', action='store_true',
+                        help="time the bot AI with every --bench-workers count (JSON report)")
+    parser.add_argument('--bench-workers', type=parse_counts, default=[0, 1, 2, 4, 8],
+                        metavar='N,N,...', help="AI worker counts to sweep")
+    parser.add_argument('--save-benchmark', action='store_true',
+                        help="compare save/load time and file size of the save formats (JSON report)")
+    parser.add_argument('--autosave', type=float, default=60, metavar='SECONDS',
+                        help="autosave interval, 0 to only save on exit (default: 60)")
+    parser.add_argument('--journal', action='store_true',
+                        help="save incrementally: a base save plus a journal of what changed")
+    parser.add_argument('--memory-benchmark', action='store_true',
+                        help="report memory per entity and garbage collections while playing (JSON)")
+    parser.add_argument('--uncompressed-saves', action='store_true',
+                        help="write the savegame without compression (bigger, a little faster)")
+    parser.add_argument('--output', help="write benchmark JSON to this file instead of stdout")
+    parser.add_argument('--record', metavar='FILE',
+                        help="play a new world and record its seed and every tick's input to FILE")
+    parser.add_argument('--replay', metavar='FILE',
+                        help="re-run a recording headless, timing every tick (JSON with --output), "
+                             "and check the final world state")
+    parser.add_argument('--flight-recorder', action='store_true',
+                        help="keep the last frames' timings and dump them to mcr_flight_*.json "
+                             "around slow frames and on exit")
+    parser.add_argument('--spike-ms', type=float, default=100.0,
+                        help="frame time that counts as a spike (default: 100)")
+    parser.add_argument('--flight-seconds', type=float, default=10.0,
+                        help="seconds of frames kept by the flight recorder (default: 10)")
+    args = parser.parse_args()
+    if args.tick_rate <= 0:
+        parser.error("--tick-rate must be above 0")
+    if args.ticks is not None and args.ticks <= 0:
+        parser.error("--ticks must be above 0")
+    if args.record and args.headless:
+        parser.error("--record records a played session; it does not work with --headless")
+    
+    if args.benchmark:
+        run_benchmark(args.bench_bots, args.bench_foods, args.bench_obstacles,
+                      300 if args.ticks is None else args.ticks,
+                      1 if args.seed is None else args.seed, args.output)
+        return
+    if args.memory_benchmark:
+        run_memory_benchmark(seed=1 if args.seed is None else args.seed, output=args.output)
+        return
+    if args.ai_benchmark:
+        run_ai_benchmark(args.bench_bots, args.bench_workers,
+                         120 if args.ticks is None else args.ticks,
+                         1 if args.seed is None else args.seed, args.output)
+        return
+    if args.save_benchmark:
+        run_save_benchmark(args.bench_bots, args.bench_foods, 
+                           1 if args.seed is None else args.seed, output=args.output)
+        return
+    if args.replay:
+        sys.exit(0 if run_replay(args.replay, args.output) else 1)
+    if args.record and args.seed is None:
+        args.seed = random.SystemRandom().getrandbits(32)
+    if args.seed is not None:
+        random.seed(args.seed)
+    recorder = None
+    if args.flight_recorder:
+        frames_per_second = args.tick_rate if args.headless else (args.fps or 60)
+        recorder = FlightRecorder(capacity=max(2, int(args.flight_seconds * frames_per_second)),
+                                  spike_ms=args.spike_ms)
+    if args.headless:
+        run_headless(3600 if args.ticks is None else args.ticks, args.world_size, args.bots,
+                     recorder, args.lod, args.ai_workers, bool(args.load))
+    else:
+        game = Game(world_size=args.world_size, minimum_bots=args.bots,
+                    tick_rate=args.tick_rate, render_fps=args.fps, recorder=recorder,
+                    load=False if args.record else args.load, autosave_interval=args.autosave,
+                    journal_saves=args.journal, lod=args.lod, ai_workers=args.ai_workers)
+        game.compress_saves = not args.uncompressed_saves
+        if args.record:
+            game.input_recording = InputRecording(args.seed, game.map_size, game.MINIMUM_BOTS,
+                                                  args.lod)
+        game.run()
+        if args.record:
+            game.input_recording.final_hash = game.state_hash()
+            game.input_recording.save(args.record)
+
+
+
 if __name__ == "__main__":
-    game = Game()
-    game.run()
+    main()
 
 